@@ -1,8 +1,7 @@
-from openai import OpenAI
-from src.config import OPENAI_API_KEY
+from src.client import get_client
 from src.state import load_state, save_state
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+client = get_client()
 
 state = load_state()
 if state.get("vector_store_id"):
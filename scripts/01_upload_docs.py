@@ -8,55 +8,84 @@ Usage:
 """
 import sys
 from pathlib import Path
-from openai import OpenAI
-from src.config import OPENAI_API_KEY
+from concurrent.futures import ThreadPoolExecutor
+from src.client import get_client
 from src.state import load_state, save_state
 from src.ingest import upload_files, attach_files_to_vector_store, wait_until_ready
+from src.ratelimit import rate_limited
+from src.semcache import semantic_cache, answer_cache
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+client = get_client()
 state = load_state()
 vs_id = state["vector_store_id"]
 
-# Check for --fresh flag to clear existing files
-if "--fresh" in sys.argv:
-    print("🗑️  Clearing existing files from vector store...")
-    existing_files = client.vector_stores.files.list(vector_store_id=vs_id)
-    for f in existing_files.data:
-        try:
-            client.vector_stores.files.delete(vector_store_id=vs_id, file_id=f.id)
-            client.files.delete(f.id)
-            print(f"   Deleted: {f.id}")
-        except Exception as e:
-            print(f"   Warning: Could not delete {f.id}: {e}")
-    state["file_ids"] = []
-    print("✅ Cleared existing files\n")
-
-# Also clean up any .txt files that were previously OCR'd (we'll regenerate them)
-if "--fresh" in sys.argv:
+
+@rate_limited
+def _delete_one(f):
+    client.vector_stores.files.delete(vector_store_id=vs_id, file_id=f.id)
+    client.files.delete(f.id)
+
+
+def _safe_delete(f):
+    try:
+        _delete_one(f)
+        print(f"   Deleted: {f.id}")
+    except Exception as e:
+        print(f"   Warning: Could not delete {f.id}: {e}")
+
+
+def _remove_ocr_file(txt_file: Path):
+    print(f"🗑️  Removing old OCR file: {txt_file.name}")
+    txt_file.unlink()
+
+
+def main():
     docs_dir = Path("data/docs")
-    for txt_file in docs_dir.glob("*.txt"):
-        pdf_counterpart = docs_dir / f"{txt_file.stem}.pdf"
-        if pdf_counterpart.exists():
-            print(f"🗑️  Removing old OCR file: {txt_file.name}")
-            txt_file.unlink()
+    fresh = "--fresh" in sys.argv
+
+    # Clear existing files, and any .txt files that were previously OCR'd (we'll regenerate them)
+    if fresh:
+        print("🗑️  Clearing existing files from vector store...")
+        existing_files = client.vector_stores.files.list(vector_store_id=vs_id)
+        pdf_stems = {p.stem for p in docs_dir.glob("*.pdf")}
+        stale_txt = [t for t in docs_dir.glob("*.txt") if t.stem in pdf_stems]
+        with ThreadPoolExecutor(max_workers=16) as ex:
+            # Local unlinks overlap with the network deletes
+            local = [ex.submit(_remove_ocr_file, t) for t in stale_txt]
+            list(ex.map(_safe_delete, existing_files.data))
+            for future in local:
+                future.result()
+        state["file_ids"] = []
+        state["file_hashes"] = {}
+        print("✅ Cleared existing files\n")
+
+    print("="*60)
+    print("📤 UPLOADING DOCUMENTS (with auto-OCR for scanned PDFs)")
+    print("="*60)
+
+    file_hashes = state.setdefault("file_hashes", {})
+    file_ids = upload_files(client, docs_dir, auto_ocr=True, file_hashes=file_hashes)
+
+    print("\n" + "="*60)
+    print("🔗 Attaching files to vector store...")
+    attach_files_to_vector_store(client, vs_id, file_ids)
 
-print("="*60)
-print("📤 UPLOADING DOCUMENTS (with auto-OCR for scanned PDFs)")
-print("="*60)
+    print("⏳ Waiting for indexing...")
+    wait_until_ready(client, vs_id)
 
-docs_dir = Path("data/docs")
-file_ids = upload_files(client, docs_dir, auto_ocr=True)
+    state["file_ids"] = state.get("file_ids", []) + file_ids
+    save_state(state)
 
-print("\n" + "="*60)
-print("🔗 Attaching files to vector store...")
-attach_files_to_vector_store(client, vs_id, file_ids)
+    # Cached retrievals and answers no longer reflect the vector store contents
+    if file_ids:
+        semantic_cache.clear()
+        answer_cache.clear()
 
-print("⏳ Waiting for indexing...")
-wait_until_ready(client, vs_id)
+    print("\n" + "="*60)
+    print(f"✅ SUCCESS! Uploaded {len(file_ids)} files")
+    print("="*60)
 
-state["file_ids"] = state.get("file_ids", []) + file_ids
-save_state(state)
 
-print("\n" + "="*60)
-print(f"✅ SUCCESS! Uploaded {len(file_ids)} files")
-print("="*60)
\ No newline at end of file
+# Guarded so OCR worker processes (spawn start method) don't re-run the upload
+if __name__ == "__main__":
+    main()
\ No newline at end of file
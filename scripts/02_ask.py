@@ -1,10 +1,10 @@
 import sys
-from openai import OpenAI
-from src.config import OPENAI_API_KEY, DEFAULT_MODEL
+from src.config import DEFAULT_MODEL
+from src.client import get_client
 from src.state import load_state
 from src.ask import ask_with_file_search
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+client = get_client()
 state = load_state()
 
 question = " ".join(sys.argv[1:]).strip() or "Give me a timeline and key findings."
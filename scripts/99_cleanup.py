@@ -1,21 +1,37 @@
-from openai import OpenAI
-from src.config import OPENAI_API_KEY
+from concurrent.futures import ThreadPoolExecutor
+from src.client import get_client
 from src.state import load_state
+from src.ratelimit import rate_limited
 import sys
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+client = get_client()
 state = load_state()
 
 vs_id = state.get("vector_store_id")
 file_ids = state.get("file_ids", [])
 
+
+@rate_limited
+def _delete_file(fid: str):
+    client.files.delete(fid)
+
+
+def _safe_delete(fid: str) -> bool:
+    try:
+        _delete_file(fid)
+        return True
+    except Exception as e:
+        print(f"Warning: Could not delete {fid}: {e}")
+        return False
+
+
 # Vector store files can be removed from the store; file deletion is separate.
 if vs_id:
     client.vector_stores.delete(vs_id)
     print("Deleted vector store:", vs_id)
 
-for fid in file_ids:
-    client.files.delete(fid)
+with ThreadPoolExecutor(max_workers=16) as ex:
+    deleted = sum(ex.map(_safe_delete, file_ids))
 
-print("Deleted files:", len(file_ids))
+print("Deleted files:", deleted)
 print("You may now delete .state.json manually.")
\ No newline at end of file
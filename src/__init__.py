@@ -2,17 +2,30 @@
 
 from .extract import (
     extract_from_document,
+    extract_from_documents,
+    extract_from_documents_batch,
+    extract_from_documents_marshalled,
     load_extracted,
     save_extracted,
+    append_extracted,
+    append_extracted_batch,
+    append_conflicts,
     merge_extraction,
     detect_conflicts,
     get_extraction_summary,
+    iter_entities,
+    iter_claims,
     remove_document_extraction
 )
 
 from .router import (
+    QueryContext,
+    make_query_context,
+    route,
     classify_query,
     answer_exhaustive_query,
+    answer_exhaustive_query_async,
+    synthesize_responses_batch,
     should_use_extracted_data,
     get_query_category
 )
@@ -22,5 +35,6 @@ from .coa import (
     should_expand_query,
     coa_report,
     coa_report_with_progress,
-    stream_manager_response
+    stream_manager_response,
+    astream_manager_response
 )
@@ -1,15 +1,58 @@
+from dataclasses import dataclass
+from typing import Optional
 from openai import OpenAI
+from .semcache import semantic_cache
+from .ratelimit import rate_limited
 
-def ask_with_file_search(client: OpenAI, model: str, vector_store_id: str, question: str, include_search_results: bool = False):
+
+@dataclass(slots=True)
+class CachedResponse:
+    """A semantic-cache hit: only the response text is stored."""
+    output_text: str
+
+
+# Only the request itself holds a limiter slot: the cache's embedding call is
+# rate-limited separately, and the limiter must never be held twice by one thread
+@rate_limited
+def _create_response(client: OpenAI, **kwargs):
+    return client.responses.create(**kwargs)
+
+
+def ask_with_file_search(
+    client: OpenAI,
+    model: str,
+    vector_store_id: str,
+    question: str,
+    include_search_results: bool = False,
+    cache_key: Optional[str] = None,
+):
+    """
+    Run a file_search-backed response.
+    If cache_key is given, a semantically similar earlier cache_key (same store/model)
+    returns its stored response text (as a CachedResponse) instead of issuing a new request.
+    """
     kwargs = {}
     # Cookbook shows include=["output[*].file_search_call.search_results"] for deeper inspection of retrieved chunks.
     if include_search_results:
         kwargs["include"] = ["output[*].file_search_call.search_results"]
 
-    resp = client.responses.create(
+    embedding = None
+    scope = f"{vector_store_id}|{model}|{include_search_results}"
+    if cache_key is not None:
+        embedding = semantic_cache.embed(client, cache_key)
+        if embedding is not None:
+            cached = semantic_cache.lookup(scope, embedding)
+            if cached is not None:
+                return CachedResponse(cached)
+
+    resp = _create_response(
+        client,
         model=model,
         input=question,
         tools=[{"type": "file_search", "vector_store_ids": [vector_store_id]}],
         **kwargs,
     )
-    return resp
\ No newline at end of file
+
+    if embedding is not None:
+        semantic_cache.add(scope, embedding, resp.output_text)
+    return resp
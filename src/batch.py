@@ -0,0 +1,94 @@
+"""
+OpenAI Batch API plumbing shared by bulk extraction and bulk synthesis.
+Batch jobs are half price and don't count against the synchronous rate limits,
+but can take minutes to hours.
+"""
+
+import io
+import time
+from typing import List, Tuple
+import orjson
+from openai import OpenAI
+from .ratelimit import rate_limited
+
+_FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+@rate_limited
+def _create_batch_file(client: OpenAI, filename: str, lines: List[bytes]):
+    return client.files.create(file=(filename, io.BytesIO(b"\n".join(lines))), purpose="batch")
+
+
+@rate_limited
+def _create_batch(client: OpenAI, input_file_id: str):
+    return client.batches.create(
+        input_file_id=input_file_id,
+        endpoint="/v1/responses",
+        completion_window="24h"
+    )
+
+
+@rate_limited
+def _retrieve_batch(client: OpenAI, batch_id: str):
+    return client.batches.retrieve(batch_id)
+
+
+@rate_limited
+def _batch_file_content(client: OpenAI, file_id: str) -> bytes:
+    return client.files.content(file_id).content
+
+
+def batch_output_text(body: dict) -> str:
+    """Collect the output_text parts from a raw Responses API body (batch results aren't SDK objects)."""
+    parts = []
+    for item in body.get("output", []):
+        if item.get("type") != "message":
+            continue
+        for content in item.get("content", []):
+            if content.get("type") == "output_text":
+                parts.append(content.get("text", ""))
+    return "".join(parts)
+
+
+def run_responses_batch(
+    client: OpenAI,
+    requests: List[Tuple[str, dict]],
+    name: str,
+    poll_interval: float = 30
+) -> Tuple[object, dict, dict]:
+    """
+    Submit (custom_id, Responses API body) requests as one batch job and wait for it.
+    custom_ids must be unique within the batch.
+
+    Returns: (batch, outputs, errors) - outputs maps custom_id -> output text for the
+        requests that succeeded, errors maps custom_id -> error for those that failed.
+        Requests in neither got no result line (e.g. the batch failed or expired).
+    """
+    lines = [
+        orjson.dumps({"custom_id": custom_id, "method": "POST", "url": "/v1/responses", "body": body})
+        for custom_id, body in requests
+    ]
+    batch_file = _create_batch_file(client, f"{name}_batch.jsonl", lines)
+    batch = _create_batch(client, batch_file.id)
+    print(f"Submitted {name} batch {batch.id} for {len(requests)} request(s)")
+
+    while batch.status not in _FINAL_STATUSES:
+        time.sleep(poll_interval)
+        batch = _retrieve_batch(client, batch.id)
+
+    outputs, errors = {}, {}
+    if not batch.output_file_id:
+        print(f"{name.capitalize()} batch {batch.id} finished with status {batch.status} and no output")
+        return batch, outputs, errors
+
+    for line in _batch_file_content(client, batch.output_file_id).splitlines():
+        if not line.strip():
+            continue
+        record = orjson.loads(line)
+        response = record.get("response") or {}
+        if record.get("error") or response.get("status_code") != 200:
+            errors[record["custom_id"]] = record.get("error") or response.get("body", {}).get("error")
+            continue
+        outputs[record["custom_id"]] = batch_output_text(response["body"])
+
+    return batch, outputs, errors
@@ -0,0 +1,47 @@
+"""
+Shared OpenAI client.
+One process-wide client so parallel workers reuse a single, larger connection pool.
+Connections use HTTP/2, so concurrent requests are multiplexed over a few TLS sessions.
+"""
+
+from functools import lru_cache
+import httpx
+from openai import OpenAI, AsyncOpenAI
+from .config import OPENAI_API_KEY
+
+HTTP_LIMITS = httpx.Limits(max_connections=128, max_keepalive_connections=64)
+HTTP_TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+
+
+@lru_cache(maxsize=1)
+def get_client() -> OpenAI:
+    """Return the process-wide OpenAI client (created on first use)."""
+    return OpenAI(
+        api_key=OPENAI_API_KEY,
+        http_client=httpx.Client(
+            limits=HTTP_LIMITS,
+            timeout=HTTP_TIMEOUT,
+            http2=True,
+        ),
+    )
+
+
+@lru_cache(maxsize=1)
+def get_async_client() -> AsyncOpenAI:
+    """Return the process-wide AsyncOpenAI client, for use from the server's event loop."""
+    return AsyncOpenAI(
+        api_key=OPENAI_API_KEY,
+        http_client=httpx.AsyncClient(
+            limits=HTTP_LIMITS,
+            timeout=HTTP_TIMEOUT,
+            http2=True,
+        ),
+    )
+
+
+async def close_clients():
+    """Close the shared clients' connection pools (on server shutdown)."""
+    if get_client.cache_info().currsize:
+        get_client().close()
+    if get_async_client.cache_info().currsize:
+        await get_async_client().close()
@@ -1,10 +1,61 @@
+import re
 import json
+import math
+import time
+import hashlib
+import orjson
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
-from typing import Generator, Callable, Optional
-from openai import OpenAI
+from functools import lru_cache, wraps
+from typing import AsyncGenerator, Generator, Callable, Optional
+from openai import OpenAI, AsyncOpenAI
 from .ask import ask_with_file_search
+from .ratelimit import rate_limited, async_retrying
 
+# All OpenAI calls in the CoA pipeline go through the shared limiter + retry
+# (ask_with_file_search limits its own requests)
+@rate_limited
+def _create_response(client: OpenAI, **kwargs):
+    return client.responses.create(**kwargs)
+
+
+@async_retrying
+async def _create_response_async(client: AsyncOpenAI, **kwargs):
+    return await client.responses.create(**kwargs)
+
+
+__all__ = [
+    "load_prompt",
+    "should_expand_query",
+    "decompose_query",
+    "coa_report",
+    "format_conversation_history",
+    "coa_report_with_progress",
+    "stream_manager_response",
+    "astream_manager_response",
+]
+
+# Bump to invalidate cached query decompositions (e.g. after changing the prompt)
+DECOMPOSE_VERSION = "v2"
+DECOMPOSE_CACHE_DIR = Path(".cache/decompose")
+
+# Phrases suggesting a question has multiple aspects worth searching separately;
+# matched as substrings of the lowercased question (so "relationships" counts)
+_MULTI_ASPECT_RE = re.compile(
+    r" and | or |including|such as|especially|relationship|connection|between|compare"
+    r"|timeline|sequence|history|background"
+)
+
+# Body of a ```json ... ``` fenced block in a model response
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+
+# Fraction of workers that must finish before the straggler timeout starts counting
+MANAGER_QUORUM = 0.75
+
+
+@lru_cache(maxsize=32)
 def load_prompt(path: Path) -> str:
+    # Prompt files don't change during a process lifetime, so read each once
     return path.read_text()
 
 
@@ -14,26 +65,18 @@ def should_expand_query(question: str) -> bool:
     Simple questions don't need expansion; complex ones do.
     """
     words = question.split()
-    question_lower = question.lower()
     
     # Short questions usually don't need expansion
     if len(words) < 6:
         return False
     
     # Questions with multiple aspects benefit from expansion
-    multi_aspect_indicators = [
-        " and ", " or ", "including", "such as", "especially",
-        "relationship", "connection", "between", "compare",
-        "timeline", "sequence", "history", "background"
-    ]
-    
-    if any(indicator in question_lower for indicator in multi_aspect_indicators):
+    if _MULTI_ASPECT_RE.search(question.lower()):
         return True
     
     # Questions with multiple entities benefit from expansion
     # (rough heuristic: multiple capitalized words that aren't at sentence start)
-    caps_words = [w for w in words[1:] if w and w[0].isupper()]
-    if len(caps_words) >= 2:
+    if sum(1 for w in words[1:] if w[0].isupper()) >= 2:
         return True
     
     # Longer questions usually benefit
@@ -43,6 +86,36 @@ def should_expand_query(question: str) -> bool:
     return False
 
 
+def _cached_decomposition(fn):
+    """
+    On-disk memoization for decompose_query, keyed by (version, model, n_variants, question).
+    Only successful expansions are cached; unexpanded questions never touch the cache.
+    """
+    @wraps(fn)
+    def wrapper(client: OpenAI, model: str, question: str, n_variants: int = 4, force_expand: bool = False):
+        if not force_expand and not should_expand_query(question):
+            return [question] * n_variants, False
+        
+        key = hashlib.sha256(f"{DECOMPOSE_VERSION}|{model}|{n_variants}|{question}".encode()).hexdigest()
+        cache_path = DECOMPOSE_CACHE_DIR / f"{key}.json"
+        if cache_path.exists():
+            try:
+                return json.loads(cache_path.read_text()), True
+            except (json.JSONDecodeError, OSError):
+                pass
+        
+        queries, expanded = fn(client, model, question, n_variants, force_expand)
+        if expanded:
+            try:
+                DECOMPOSE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                cache_path.write_text(json.dumps(queries))
+            except OSError as e:
+                print(f"Could not cache query decomposition: {e}")
+        return queries, expanded
+    return wrapper
+
+
+@_cached_decomposition
 def decompose_query(
     client: OpenAI, 
     model: str, 
@@ -60,7 +133,9 @@ def decompose_query(
     if not force_expand and not should_expand_query(question):
         return [question] * n_variants, False
     
-    prompt = f"""Generate {n_variants} different search queries to find information for this investigation question.
+    # Static instructions first and the question last, so repeated decompositions
+    # share a cacheable prompt prefix
+    prompt = f"""Generate {n_variants} different search queries to find information for the investigation question at the end.
 
 RULES:
 - Each query should target a DIFFERENT aspect, angle, or entity
@@ -68,29 +143,19 @@ RULES:
 - Keep queries focused and specific
 - Include variations that might surface edge cases or related context
 
-QUESTION: {question}
-
 Return ONLY a valid JSON array of exactly {n_variants} search query strings.
-Example format: ["query about aspect 1", "query about aspect 2", "query about aspect 3", "query about aspect 4"]"""
+Example format: ["query about aspect 1", "query about aspect 2", "query about aspect 3", "query about aspect 4"]
+
+QUESTION: {question}"""
     
     try:
-        resp = client.responses.create(model=model, input=prompt)
+        resp = _create_response(client, model=model, input=prompt)
         response_text = resp.output_text.strip()
         
         # Handle markdown code blocks
-        if response_text.startswith("```"):
-            lines = response_text.split("\n")
-            json_lines = []
-            in_json = False
-            for line in lines:
-                if line.startswith("```") and not in_json:
-                    in_json = True
-                    continue
-                elif line.startswith("```") and in_json:
-                    break
-                elif in_json:
-                    json_lines.append(line)
-            response_text = "\n".join(json_lines)
+        m = _FENCE_RE.search(response_text)
+        if m:
+            response_text = m.group(1)
         
         queries = json.loads(response_text)
         
@@ -112,6 +177,76 @@ Example format: ["query about aspect 1", "query about aspect 2", "query about as
         print(f"Query decomposition error: {e}")
         return [question] * n_variants, False
 
+
+def _worker_input(prefix: str, search_query: str, i: int, n_workers: int) -> str:
+    """Append the per-worker tail to the shared worker prompt prefix."""
+    return (
+        f"{prefix}"
+        f"YOUR SEARCH FOCUS:\n{search_query}\n\n"
+        f"WORKER PASS: {i+1}/{n_workers}\n"
+        f"Search for information related to your focus area while keeping the original question in mind."
+    )
+
+
+def _run_worker(
+    client: OpenAI,
+    model: str,
+    vector_store_id: str,
+    worker_input: str,
+    search_query: str,
+    cache_key: Optional[str] = None,
+) -> dict:
+    """
+    Run a single CoA worker pass and parse its JSON output, tagged with the
+    search query it used. Runs entirely in the worker thread so the collector
+    only receives ready dicts.
+    Falls back to {"raw_text": ...} if the worker didn't return valid JSON.
+    cache_key enables the semantic response cache (see ask_with_file_search).
+    """
+    r = ask_with_file_search(
+        client, model, vector_store_id, worker_input,
+        include_search_results=False, cache_key=cache_key
+    )
+    text = r.output_text
+    try:
+        parsed = orjson.loads(text)
+    except Exception:
+        parsed = None
+    if not isinstance(parsed, dict):
+        parsed = {"raw_text": text}
+    # Add metadata about which query this worker used
+    parsed["_search_query"] = search_query
+    return parsed
+
+
+def _compact_outputs(worker_outputs: list, max_raw_text: int = 2000) -> list:
+    """
+    Shrink worker outputs before embedding them in the manager prompt.
+    List items (findings, answers, context...) already reported by an earlier worker
+    are dropped, emptied lists are removed, and unparsed raw_text is truncated.
+    """
+    seen = set()
+    compact = []
+    for output in worker_outputs:
+        slim = {}
+        for key, value in output.items():
+            if key == "raw_text" and isinstance(value, str) and len(value) > max_raw_text:
+                value = value[:max_raw_text] + "..."
+            elif isinstance(value, list):
+                unique_items = []
+                for item in value:
+                    item_key = (key, orjson.dumps(item, option=orjson.OPT_SORT_KEYS))
+                    if item_key not in seen:
+                        seen.add(item_key)
+                        unique_items.append(item)
+                if not unique_items:
+                    continue
+                value = unique_items
+            slim[key] = value
+        compact.append(slim)
+    return compact
+
+
 def coa_report(
     client: OpenAI,
     model: str,
@@ -131,30 +266,29 @@ def coa_report(
         search_queries = [question] * n_workers
         expanded = False
 
-    worker_outputs = []
-    for i in range(n_workers):
-        search_query = search_queries[i]
-        
-        worker_input = (
-            f"{worker_prompt}\n\n"
-            f"ORIGINAL USER QUESTION:\n{question}\n\n"
-            f"YOUR SEARCH FOCUS:\n{search_query}\n\n"
-            f"WORKER PASS: {i+1}/{n_workers}\n"
-            f"Search for information related to your focus area while keeping the original question in mind."
-        )
-        r = ask_with_file_search(client, model, vector_store_id, worker_input, include_search_results=False)
-        text = r.output_text
-        try:
-            worker_outputs.append(json.loads(text))
-        except Exception:
-            worker_outputs.append({"raw_text": text})
+    # Identical queries (e.g. no expansion) would just repeat the same retrieval,
+    # so run one worker per unique search focus
+    search_queries = list(dict.fromkeys(search_queries))
+    n_passes = len(search_queries)
+
+    # Shared by every worker; only the search focus and pass number vary
+    worker_prefix = f"{worker_prompt}\n\nORIGINAL USER QUESTION:\n{question}\n\n"
+
+    def run_worker(i: int) -> dict:
+        worker_input = _worker_input(worker_prefix, search_queries[i], i, n_passes)
+        cache_key = f"{question}\n{search_queries[i]}"
+        return _run_worker(client, model, vector_store_id, worker_input, search_queries[i], cache_key=cache_key)
+
+    # Workers are independent network round-trips, so run them concurrently
+    with ThreadPoolExecutor(max_workers=n_passes, thread_name_prefix="coa-worker") as ex:
+        worker_outputs = list(ex.map(run_worker, range(n_passes)))
 
     manager_input = (
         f"{manager_prompt}\n\n"
         f"ORIGINAL QUESTION:\n{question}\n\n"
-        f"WORKER OUTPUTS (JSON):\n{json.dumps(worker_outputs, indent=2)}\n"
+        f"WORKER OUTPUTS (JSON):\n{orjson.dumps(_compact_outputs(worker_outputs)).decode()}\n"
     )
-    manager_resp = client.responses.create(model=model, input=manager_input)
+    manager_resp = _create_response(client, model=model, input=manager_input)
     return manager_resp.output_text
 
 
@@ -163,18 +297,20 @@ def format_conversation_history(history: list) -> str:
     if not history:
         return ""
     
-    formatted = "CONVERSATION HISTORY:\n"
+    parts = ["CONVERSATION HISTORY:\n"]
     for msg in history:
         # Support both 'role' (from frontend) and 'sender' formats
         role_value = msg.get("role") or msg.get("sender", "")
-        role = "User" if role_value in ["user", "User"] else "Assistant"
+        role = "User" if role_value in ("user", "User") else "Assistant"
         content = msg.get("content", "")
         # Truncate long messages to avoid token limits
         if len(content) > 500:
-            content = content[:500] + "..."
-        formatted += f"{role}: {content}\n\n"
+            parts.append(f"{role}: {content[:500]}...\n\n")
+        else:
+            parts.append(f"{role}: {content}\n\n")
     
-    return formatted + "---\n\n"
+    parts.append("---\n\n")
+    return "".join(parts)
 
 
 def coa_report_with_progress(
@@ -186,6 +322,7 @@ def coa_report_with_progress(
     on_progress: Optional[Callable[[str, int, int], None]] = None,
     conversation_history: Optional[list] = None,
     use_query_expansion: bool = True,
+    straggler_timeout: Optional[float] = None,
 ) -> tuple[list, str]:
     """
     Run CoA analysis with progress callbacks for workers.
@@ -193,6 +330,10 @@ def coa_report_with_progress(
     
     If use_query_expansion is True, generates diverse search queries for each worker
     to maximize retrieval coverage across different semantic spaces.
+    
+    If straggler_timeout is set, once MANAGER_QUORUM of the workers have finished the
+    remaining ones get at most that many seconds; any still running are left out of
+    the manager input so a single slow worker doesn't hold up synthesis.
     """
     worker_prompt = load_prompt(Path("prompts/worker.md"))
     manager_prompt = load_prompt(Path("prompts/manager.md"))
@@ -211,46 +352,99 @@ def coa_report_with_progress(
         search_queries = [question] * n_workers
         expanded = False
 
-    worker_outputs = []
-    for i in range(n_workers):
+    # Identical queries (e.g. no expansion) would just repeat the same retrieval,
+    # so run one worker per unique search focus
+    search_queries = list(dict.fromkeys(search_queries))
+    n_passes = len(search_queries)
+
+    # Shared by every worker; only the search focus and pass number vary
+    worker_prefix = f"{worker_prompt}\n\n{history_context}ORIGINAL USER QUESTION:\n{question}\n\n"
+
+    def run_worker(i: int) -> dict:
         search_query = search_queries[i]
-        
-        if on_progress:
-            # Show the search focus if expanded, otherwise generic message
-            if expanded and search_query != question:
-                status = f"Worker {i+1} searching: \"{search_query[:40]}{'...' if len(search_query) > 40 else ''}\""
-            else:
-                status = f"Worker {i+1} analyzing documents..."
-            on_progress(status, i + 1, n_workers)
-        
-        worker_input = (
-            f"{worker_prompt}\n\n"
-            f"{history_context}"
-            f"ORIGINAL USER QUESTION:\n{question}\n\n"
-            f"YOUR SEARCH FOCUS:\n{search_query}\n\n"
-            f"WORKER PASS: {i+1}/{n_workers}\n"
-            f"Search for information related to your focus area while keeping the original question in mind."
-        )
-        r = ask_with_file_search(client, model, vector_store_id, worker_input, include_search_results=False)
-        text = r.output_text
-        try:
-            parsed = json.loads(text)
-            # Add metadata about which query this worker used
-            parsed["_search_query"] = search_query
-            worker_outputs.append(parsed)
-        except Exception:
-            worker_outputs.append({"raw_text": text, "_search_query": search_query})
+        worker_input = _worker_input(worker_prefix, search_query, i, n_passes)
+        # Follow-ups depend on the conversation, so only cache standalone questions
+        cache_key = None if history_context else f"{question}\n{search_query}"
+        return _run_worker(client, model, vector_store_id, worker_input, search_query, cache_key=cache_key)
+
+    # Dispatch all workers at once; results are stored by index to keep ordering stable
+    worker_outputs = [None] * n_passes
+    completed = 0
+    quorum = math.ceil(n_passes * MANAGER_QUORUM)
+    deadline = None
+    
+    # Not a `with` block: shutting down must not wait on abandoned stragglers
+    ex = ThreadPoolExecutor(max_workers=n_passes, thread_name_prefix="coa-worker")
+    try:
+        futures = {ex.submit(run_worker, i): i for i in range(n_passes)}
+        pending = set(futures)
+        while pending:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                print(f"Proceeding to synthesis without {len(pending)} slow worker(s)")
+                break
+            
+            for future in done:
+                i = futures[future]
+                worker_outputs[i] = future.result()
+                completed += 1
+                
+                if on_progress:
+                    # Show the search focus if expanded, otherwise generic message
+                    search_query = search_queries[i]
+                    if expanded and search_query != question:
+                        status = f"Worker {i+1} finished: \"{search_query[:40]}{'...' if len(search_query) > 40 else ''}\""
+                    else:
+                        status = f"Worker {i+1} finished analyzing documents"
+                    on_progress(status, completed, n_passes)
+            
+            if deadline is None and straggler_timeout is not None and completed >= quorum:
+                deadline = time.monotonic() + straggler_timeout
+    finally:
+        ex.shutdown(wait=False, cancel_futures=True)
+    
+    worker_outputs = [output for output in worker_outputs if output is not None]
 
     manager_input = (
         f"{manager_prompt}\n\n"
         f"{history_context}"
         f"CURRENT QUESTION:\n{question}\n\n"
-        f"WORKER OUTPUTS (JSON):\n{json.dumps(worker_outputs, indent=2)}\n"
+        f"WORKER OUTPUTS (JSON):\n{orjson.dumps(_compact_outputs(worker_outputs)).decode()}\n"
     )
     
     return worker_outputs, manager_input
 
 
+def _delta_text(event) -> Optional[str]:
+    return getattr(getattr(event, 'delta', None), 'text', None)
+
+
+# Text extractors keyed by streaming event type (one dict lookup per event)
+_STREAM_EVENT_HANDLERS = {
+    'response.output_text.delta': lambda event: getattr(event, 'delta', None),
+    'response.content_part.delta': _delta_text,
+    'content_block_delta': _delta_text,
+}
+
+
+def _event_text(event) -> Optional[str]:
+    """Text carried by one streaming event, or None."""
+    # Handle different event types from the Responses API
+    event_type = getattr(event, 'type', None)
+    if event_type is not None:
+        handler = _STREAM_EVENT_HANDLERS.get(event_type)
+        return handler(event) if handler else None
+    # Also check for direct text attribute
+    if hasattr(event, 'text'):
+        return event.text
+    if hasattr(event, 'delta'):
+        if isinstance(event.delta, str):
+            return event.delta
+        return getattr(event.delta, 'text', None)
+    return None
+
+
 def stream_manager_response(
     client: OpenAI,
     model: str,
@@ -262,43 +456,54 @@ def stream_manager_response(
     """
     try:
         # Try streaming first
-        stream = client.responses.create(
+        stream = _create_response(
+            client,
             model=model,
             input=manager_input,
             stream=True
         )
         
         for event in stream:
-            # Handle different event types from the Responses API
-            if hasattr(event, 'type'):
-                if event.type == 'response.output_text.delta':
-                    if hasattr(event, 'delta'):
-                        yield event.delta
-                elif event.type == 'response.content_part.delta':
-                    if hasattr(event, 'delta') and hasattr(event.delta, 'text'):
-                        yield event.delta.text
-                elif event.type == 'content_block_delta':
-                    if hasattr(event, 'delta') and hasattr(event.delta, 'text'):
-                        yield event.delta.text
-            # Also check for direct text attribute
-            elif hasattr(event, 'text'):
-                yield event.text
-            elif hasattr(event, 'delta'):
-                if isinstance(event.delta, str):
-                    yield event.delta
-                elif hasattr(event.delta, 'text'):
-                    yield event.delta.text
+            text = _event_text(event)
+            if text:
+                yield text
                     
     except Exception as e:
         # Fallback: If streaming fails, get full response and simulate streaming
         print(f"Streaming not available, falling back to full response: {e}")
         try:
-            response = client.responses.create(model=model, input=manager_input)
+            response = _create_response(client, model=model, input=manager_input)
             full_text = response.output_text
             
             # Simulate streaming by yielding chunks
-            chunk_size = 10  # characters per chunk
+            chunk_size = 4096  # characters per chunk; large enough to keep generator overhead low
             for i in range(0, len(full_text), chunk_size):
                 yield full_text[i:i + chunk_size]
         except Exception as e2:
             yield f"Error generating response: {e2}"
+
+
+async def astream_manager_response(
+    client: AsyncOpenAI,
+    model: str,
+    manager_input: str,
+) -> AsyncGenerator[str, None]:
+    """
+    stream_manager_response on an AsyncOpenAI client: tokens are yielded as they
+    arrive, on the event loop, instead of being collected in a worker thread.
+    """
+    try:
+        stream = await _create_response_async(client, model=model, input=manager_input, stream=True)
+    except Exception as e:
+        print(f"Streaming not available, falling back to full response: {e}")
+        try:
+            response = await _create_response_async(client, model=model, input=manager_input)
+            yield response.output_text
+        except Exception as e2:
+            yield f"Error generating response: {e2}"
+        return
+    
+    async for event in stream:
+        text = _event_text(event)
+        if text:
+            yield text
@@ -8,4 +8,8 @@ if not OPENAI_API_KEY:
     print("Warning: OPENAI_API_KEY not found. Some features will be limited.")
     OPENAI_API_KEY = "sk-placeholder"  # Allow server to start for UI testing
 
-DEFAULT_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
\ No newline at end of file
+DEFAULT_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+
+# Shared limits for OpenAI calls (workers, decomposition, manager all share one key)
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+OPENAI_RPM = int(os.getenv("OPENAI_RPM", "500"))  # 0 disables the per-minute cap
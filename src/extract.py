@@ -3,22 +3,125 @@ Document extraction module for preprocessing documents at upload time.
 Extracts structured data (entities, claims, events) for exhaustive queries.
 """
 
-import json
+import threading
+import ijson
+import orjson
+import tiktoken
 from pathlib import Path
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from openai import OpenAI
+from rapidfuzz import fuzz, process
+from .ratelimit import rate_limited
+from .batch import run_responses_batch
 
 EXTRACTED_PATH = Path("data/extracted.json")
+# Append-only log of changes since the last full snapshot, one JSON record per line:
+#   {"doc": name, "data": extraction}  - merge a document's extraction
+#   {"doc": name, "removed": true}     - drop a document's extraction
+#   {"conflicts": [...]}               - replace the detected conflicts
+EXTRACTED_LOG_PATH = Path("data/extracted.jsonl")
+# Fold the log into the snapshot once it grows past this size
+EXTRACTED_LOG_MAX_BYTES = 10 * 1024 * 1024
+# Documents longer than this many tokens are extracted in overlapping chunks
+EXTRACT_CHUNK_TOKENS = 12000
+EXTRACT_CHUNK_OVERLAP = 200
+EXTRACT_CHUNK_WORKERS = 4
+
+
+# Parsed data from the last load, reused while neither file has changed on disk
+_extracted_cache = {"key": None, "data": None}
+
+
+def _extracted_files_key() -> tuple:
+    """Identify the current on-disk version of the snapshot and change log."""
+    key = []
+    for path in (EXTRACTED_PATH, EXTRACTED_LOG_PATH):
+        try:
+            st = path.stat()
+            key.append((st.st_mtime_ns, st.st_size, st.st_ino))
+        except FileNotFoundError:
+            key.append(None)
+    return tuple(key)
+
+
+def load_extracted(mutable: bool = False) -> dict:
+    """
+    Load previously extracted data: the JSON snapshot plus any logged changes since.
+    
+    The parsed result is cached until either file changes and is shared between
+    callers, so treat it as read-only; pass mutable=True for a private copy to modify.
+    """
+    key = _extracted_files_key()
+    if not mutable and _extracted_cache["key"] == key:
+        return _extracted_cache["data"]
+    
+    all_data = _read_extracted()
+    if not mutable:
+        _extracted_cache["key"] = key
+        _extracted_cache["data"] = all_data
+    return all_data
 
 
-def load_extracted() -> dict:
-    """Load previously extracted data from JSON file."""
+def _read_extracted() -> dict:
+    """Parse the snapshot and replay the change log."""
+    all_data = _empty_extraction()
     if EXTRACTED_PATH.exists():
         try:
-            return json.loads(EXTRACTED_PATH.read_text())
-        except json.JSONDecodeError:
-            return _empty_extraction()
-    return _empty_extraction()
+            all_data = orjson.loads(EXTRACTED_PATH.read_bytes())
+        except orjson.JSONDecodeError:
+            pass
+    
+    if EXTRACTED_LOG_PATH.exists():
+        for line in EXTRACTED_LOG_PATH.read_bytes().splitlines():
+            if not line.strip():
+                continue
+            try:
+                record = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                # A torn final line from an interrupted append
+                continue
+            _apply_log_record(all_data, record)
+    
+    return all_data
+
+
+def _has_pending_log() -> bool:
+    """True if the change log holds records not yet folded into the snapshot."""
+    try:
+        return EXTRACTED_LOG_PATH.stat().st_size > 0
+    except FileNotFoundError:
+        return False
+
+
+def _iter_section(section: str):
+    """
+    Yield the items of one top-level list of the extracted data.
+    
+    With no pending log the snapshot is stream-parsed, so nothing beyond the
+    current item is held in memory; otherwise falls back to load_extracted().
+    """
+    if _has_pending_log():
+        yield from load_extracted().get(section, [])
+        return
+    if not EXTRACTED_PATH.exists():
+        return
+    try:
+        with open(EXTRACTED_PATH, "rb") as f:
+            yield from ijson.items(f, f"{section}.item")
+    except ijson.JSONError:
+        return
+
+
+def iter_entities():
+    """Stream extracted entities."""
+    return _iter_section("entities")
+
+
+def iter_claims():
+    """Stream extracted claims."""
+    return _iter_section("claims")
 
 
 def _empty_extraction() -> dict:
@@ -33,21 +136,64 @@ def _empty_extraction() -> dict:
 
 
 def save_extracted(data: dict):
-    """Save extracted data to JSON file."""
+    """Save a full snapshot of extracted data to JSON file, folding in the change log."""
     EXTRACTED_PATH.parent.mkdir(parents=True, exist_ok=True)
-    EXTRACTED_PATH.write_text(json.dumps(data, indent=2))
+    tmp_path = EXTRACTED_PATH.with_suffix(".json.tmp")
+    tmp_path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    tmp_path.replace(EXTRACTED_PATH)
+    EXTRACTED_LOG_PATH.unlink(missing_ok=True)
+    _extracted_cache["key"] = None
 
 
-def extract_from_document(client: OpenAI, model: str, doc_text: str, doc_name: str) -> dict:
+def _apply_log_record(all_data: dict, record: dict):
+    """Replay one change-log record onto all_data."""
+    if "conflicts" in record:
+        all_data["conflicts"] = record["conflicts"]
+    elif record.get("removed"):
+        _remove_document(all_data, record["doc"])
+    elif "data" in record:
+        merge_extraction(all_data, record["data"], record["doc"])
+
+
+def _append_log(*records: dict):
+    """Append change records (in one write) instead of rewriting the whole snapshot."""
+    EXTRACTED_LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(EXTRACTED_LOG_PATH, "ab") as f:
+        f.write(b"".join(orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE) for record in records))
+    _extracted_cache["key"] = None
+    
+    if EXTRACTED_LOG_PATH.stat().st_size > EXTRACTED_LOG_MAX_BYTES:
+        save_extracted(load_extracted())
+
+
+def append_extracted(doc_name: str, extraction: dict):
+    """Record a document's extraction (merged into the data on load)."""
+    _append_log({"doc": doc_name, "data": extraction})
+
+
+def append_extracted_batch(extractions: list, conflicts: list = None):
     """
-    Extract structured information from a document using LLM.
-    Run once per document at upload time.
+    Record several (doc_name, extraction) pairs, and optionally the conflicts detected
+    over them, with a single log write and at most one compaction.
     """
-    
-    prompt = """Analyze this document and extract ALL structured information.
+    records = [{"doc": doc_name, "data": extraction} for doc_name, extraction in extractions]
+    if conflicts is not None:
+        records.append({"conflicts": conflicts})
+    if records:
+        _append_log(*records)
 
-Return ONLY valid JSON with this exact structure:
-{
+
+def append_conflicts(conflicts: list):
+    """Record a freshly detected conflicts list (replaces earlier conflicts on load)."""
+    _append_log({"conflicts": conflicts})
+
+
+@rate_limited
+def _create_response(client: OpenAI, **kwargs):
+    return client.responses.create(**kwargs)
+
+
+_EXTRACT_SCHEMA = """{
     "entities": [
         {"name": "full name or title", "type": "Person|Organization|Location|Date|Money|Other", "description": "brief context about this entity", "mentions": ["quote where mentioned"]}
     ],
@@ -68,69 +214,330 @@ Rules:
 - For claims, focus on assertions, statements, and testimony
 - For events, capture anything with a temporal or sequential nature
 - Be thorough - this extraction will be used to answer comprehensive queries later
+"""
+
+_EXTRACT_PROMPT = f"""Analyze this document and extract ALL structured information.
 
+Return ONLY valid JSON with this exact structure:
+{_EXTRACT_SCHEMA}
 DOCUMENT:
 """
+
+# The document count comes last so every batch shares the instructions + schema prefix
+# (OpenAI prompt caching only matches identical leading tokens)
+_MARSHALLED_PROMPT = """Analyze each of the documents below and extract ALL structured information from each one separately.
+Each document starts with a "--- DOC i: name ---" line.
+
+Return ONLY a valid JSON array with one object per document in the order given, each with this exact structure:
+""" + _EXTRACT_SCHEMA.replace("{", "{{").replace("}", "}}") + """
+DOCUMENTS (exactly {n}, so return exactly {n} objects):
+"""
+
+
+def _extraction_input(doc_text: str) -> str:
+    """Build the extraction prompt for a document (or one chunk of it)."""
+    return f"{_EXTRACT_PROMPT}\n\n{doc_text}"
+
+
+# Rough chars-per-token ratio used when no tokenizer is available
+_CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    """
+    Tokenizer for a model, falling back to the current default encoding for unknown names.
+    Returns None if the encoding can't be loaded (tiktoken fetches it on first use).
+    """
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        print(f"Tokenizer unavailable, estimating tokens from length: {e}")
+        return None
+
+
+def _chunk_document(
+    doc_text: str,
+    model: str,
+    budget: int = EXTRACT_CHUNK_TOKENS,
+    overlap: int = EXTRACT_CHUNK_OVERLAP,
+) -> list[str]:
+    """Split a document into chunks of at most budget tokens, consecutive chunks sharing overlap tokens."""
+    enc = _encoding(model)
+    if enc is None:
+        budget, overlap = budget * _CHARS_PER_TOKEN, overlap * _CHARS_PER_TOKEN
+        if len(doc_text) <= budget:
+            return [doc_text]
+        return [doc_text[start:start + budget] for start in range(0, len(doc_text) - overlap, budget - overlap)]
+    
+    ids = enc.encode(doc_text, disallowed_special=())
+    if len(ids) <= budget:
+        return [doc_text]
+    step = budget - overlap
+    return [enc.decode(ids[start:start + budget]) for start in range(0, len(ids) - overlap, step)]
+
+
+def _merge_chunk_extractions(parts: list[dict]) -> dict:
+    """Combine the extractions of one document's chunks into a single extraction."""
+    if len(parts) == 1:
+        return parts[0]
+    failed = [p for p in parts if "extraction_error" in p]
+    succeeded = [p for p in parts if "extraction_error" not in p]
+    if not succeeded:
+        return failed[0]
+    
+    merged = {"entities": [], "claims": [], "events": [], "key_facts": []}
+    for part in succeeded:
+        merge_extraction(merged, part, None)
+    del merged["documents"]
+    
+    if failed:
+        merged["extraction_error"] = f"{len(failed)} of {len(parts)} chunks failed: {failed[0]['extraction_error']}"
+    return merged
+
+
+def _failed_extraction(error: str, raw_response: str = None) -> dict:
+    """Return empty extraction result recording why it failed."""
+    result = {
+        "entities": [],
+        "claims": [],
+        "events": [],
+        "key_facts": [],
+        "extraction_error": error
+    }
+    if raw_response is not None:
+        result["raw_response"] = raw_response[:1000]
+    return result
+
+
+def _strip_code_fence(response_text: str) -> str:
+    """Return the body of a markdown code block, or the text unchanged if there is none."""
+    if not response_text.startswith("```"):
+        return response_text
+    # Slice between the opening fence line and the next closing fence
+    start = response_text.find("\n") + 1
+    if start == 0:
+        return ""
+    end = response_text.find("\n```", start - 1)
+    return response_text[start:end] if end != -1 else response_text[start:]
+
+
+def _tag_extraction(extracted: dict, doc_name: str) -> dict:
+    """Tag every extracted item with its source document."""
+    for item in extracted.get("entities", []):
+        item["source"] = doc_name
+    for item in extracted.get("claims", []):
+        item["source"] = doc_name
+    for item in extracted.get("events", []):
+        item["source"] = doc_name
+    for i, fact in enumerate(extracted.get("key_facts", [])):
+        if isinstance(fact, str):
+            extracted["key_facts"][i] = {"fact": fact, "source": doc_name}
+    return extracted
+
+
+def _parse_extraction(response_text: str, doc_name: str) -> dict:
+    """Parse an extraction response and tag every item with its source document."""
+    response_text = _strip_code_fence(response_text.strip())
     
     try:
-        resp = client.responses.create(
-            model=model,
-            input=f"{prompt}\n\n{doc_text[:50000]}"  # Limit to ~50k chars to stay within context
-        )
-        
-        # Try to parse JSON from response
-        response_text = resp.output_text.strip()
-        
-        # Handle markdown code blocks
-        if response_text.startswith("```"):
-            lines = response_text.split("\n")
-            # Remove first and last lines (code fence)
-            json_lines = []
-            in_json = False
-            for line in lines:
-                if line.startswith("```") and not in_json:
-                    in_json = True
-                    continue
-                elif line.startswith("```") and in_json:
-                    break
-                elif in_json:
-                    json_lines.append(line)
-            response_text = "\n".join(json_lines)
-        
-        extracted = json.loads(response_text)
-        
-        # Tag everything with source document
-        for item in extracted.get("entities", []):
-            item["source"] = doc_name
-        for item in extracted.get("claims", []):
-            item["source"] = doc_name
-        for item in extracted.get("events", []):
-            item["source"] = doc_name
-        for i, fact in enumerate(extracted.get("key_facts", [])):
-            if isinstance(fact, str):
-                extracted["key_facts"][i] = {"fact": fact, "source": doc_name}
-        
-        return extracted
-        
-    except json.JSONDecodeError as e:
+        extracted = orjson.loads(response_text)
+    except orjson.JSONDecodeError as e:
         print(f"JSON parse error during extraction: {e}")
-        return {
-            "entities": [],
-            "claims": [],
-            "events": [],
-            "key_facts": [],
-            "extraction_error": str(e),
-            "raw_response": resp.output_text[:1000] if 'resp' in dir() else "No response"
-        }
+        return _failed_extraction(str(e), response_text)
+    if not isinstance(extracted, dict):
+        # Valid JSON of the wrong shape (e.g. a bare array)
+        error = f"Expected a JSON object, got {type(extracted).__name__}"
+        print(f"Extraction error: {error}")
+        return _failed_extraction(error, response_text)
+    
+    return _tag_extraction(extracted, doc_name)
+
+
+def extract_from_document(client: OpenAI, model: str, doc_text: str, doc_name: str) -> dict:
+    """
+    Extract structured information from a document using LLM.
+    Run once per document at upload time.
+    """
+    chunks = _chunk_document(doc_text, model)
+    if len(chunks) == 1:
+        return _extract_chunk(client, model, doc_text, doc_name)
+    
+    # Long documents: extract overlapping chunks concurrently instead of truncating
+    with ThreadPoolExecutor(max_workers=min(len(chunks), EXTRACT_CHUNK_WORKERS)) as ex:
+        parts = list(ex.map(lambda chunk: _extract_chunk(client, model, chunk, doc_name), chunks))
+    return _merge_chunk_extractions(parts)
+
+
+def _extract_chunk(client: OpenAI, model: str, text: str, doc_name: str) -> dict:
+    """Run the extraction prompt on a single piece of text."""
+    try:
+        resp = _create_response(client, model=model, input=_extraction_input(text))
+        return _parse_extraction(resp.output_text, doc_name)
     except Exception as e:
         print(f"Extraction error: {e}")
-        return {
-            "entities": [],
-            "claims": [],
-            "events": [],
-            "key_facts": [],
-            "extraction_error": str(e)
+        return _failed_extraction(str(e))
+
+
+def extract_from_documents(
+    client: OpenAI,
+    model: str,
+    docs: list[tuple[str, str]],
+    max_workers: int = 8,
+) -> list[tuple[str, dict]]:
+    """
+    Extract structured information from several documents concurrently.
+    
+    Args:
+        docs: list of (doc_name, doc_text) pairs
+    
+    Returns: list of (doc_name, extraction) in the same order as docs
+    """
+    if not docs:
+        return []
+    
+    results = [None] * len(docs)
+    with ThreadPoolExecutor(max_workers=min(len(docs), max_workers)) as ex:
+        futures = {
+            ex.submit(extract_from_document, client, model, doc_text, doc_name): i
+            for i, (doc_name, doc_text) in enumerate(docs)
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            results[i] = (docs[i][0], future.result())
+    
+    return results
+
+
+def _extract_marshalled_group(client: OpenAI, model: str, group: list[tuple[str, str]]) -> list[dict]:
+    """
+    Extract several short documents with a single LLM call.
+    Falls back to one call per document if the response isn't an array of the right length.
+    """
+    if len(group) == 1:
+        doc_name, doc_text = group[0]
+        return [extract_from_document(client, model, doc_text, doc_name)]
+    
+    body = "".join(
+        f"\n--- DOC {i+1}: {doc_name} ---\n{doc_text}\n"
+        for i, (doc_name, doc_text) in enumerate(group)
+    )
+    try:
+        resp = _create_response(client, model=model, input=_MARSHALLED_PROMPT.format(n=len(group)) + body)
+        extractions = orjson.loads(_strip_code_fence(resp.output_text.strip()))
+        if isinstance(extractions, list) and len(extractions) == len(group) and all(isinstance(e, dict) for e in extractions):
+            return [_tag_extraction(e, doc_name) for e, (doc_name, _) in zip(extractions, group)]
+        print(f"Marshalled extraction returned an unexpected shape for {len(group)} documents, retrying individually")
+    except Exception as e:
+        print(f"Marshalled extraction error, retrying individually: {e}")
+    
+    return [extract_from_document(client, model, doc_text, doc_name) for doc_name, doc_text in group]
+
+
+def extract_from_documents_marshalled(
+    client: OpenAI,
+    model: str,
+    docs: list[tuple[str, str]],
+    batch_chars: int = 30000,
+    max_workers: int = 8,
+) -> list[tuple[str, dict]]:
+    """
+    Extract from many documents, packing short ones into shared LLM calls.
+    Documents are grouped greedily (in order) while their combined length stays under
+    batch_chars; longer documents get their own call. Groups run concurrently.
+    
+    Returns: list of (doc_name, extraction) in the same order as docs
+    """
+    if not docs:
+        return []
+    
+    groups = []
+    current, current_chars = [], 0
+    for i, (doc_name, doc_text) in enumerate(docs):
+        if current and current_chars + len(doc_text) >= batch_chars:
+            groups.append(current)
+            current, current_chars = [], 0
+        current.append(i)
+        current_chars += len(doc_text)
+    if current:
+        groups.append(current)
+    
+    results = [None] * len(docs)
+    with ThreadPoolExecutor(max_workers=min(len(groups), max_workers)) as ex:
+        futures = {
+            ex.submit(_extract_marshalled_group, client, model, [docs[i] for i in group]): group
+            for group in groups
         }
+        for future in as_completed(futures):
+            for i, extraction in zip(futures[future], future.result()):
+                results[i] = (docs[i][0], extraction)
+    
+    return results
+
+
+def extract_from_documents_batch(
+    client: OpenAI,
+    model: str,
+    docs: list[tuple[str, str]],
+    poll_interval: float = 30,
+    min_batch_size: int = 5,
+) -> list[tuple[str, dict]]:
+    """
+    Extract structured information from many documents via the OpenAI Batch API.
+    Batch jobs are half price and don't count against the synchronous rate limits,
+    but can take minutes to hours - use only where latency doesn't matter.
+    Falls back to the concurrent synchronous path for small inputs.
+    
+    Returns: list of (doc_name, extraction) in the same order as docs
+    """
+    if len(docs) < min_batch_size:
+        return extract_from_documents(client, model, docs)
+    
+    # custom_id must be unique, and document names might not be
+    requests = []
+    chunk_counts = []
+    for i, (doc_name, doc_text) in enumerate(docs):
+        chunks = _chunk_document(doc_text, model)
+        chunk_counts.append(len(chunks))
+        for j, chunk in enumerate(chunks):
+            requests.append((f"doc-{i}-{j}", {"model": model, "input": _extraction_input(chunk)}))
+    batch, outputs, errors = run_responses_batch(client, requests, "extraction", poll_interval)
+    
+    # Chunks with no output line keep the batch-level failure
+    parts = [[_failed_extraction(f"Batch {batch.id} {batch.status}")] * n for n in chunk_counts]
+    for custom_id, error in errors.items():
+        _, i, j = custom_id.split("-")
+        parts[int(i)][int(j)] = _failed_extraction(f"Batch request failed: {error}")
+    for custom_id, text in outputs.items():
+        _, i, j = custom_id.split("-")
+        parts[int(i)][int(j)] = _parse_extraction(text, docs[int(i)][0])
+    
+    return [(doc_name, _merge_chunk_extractions(parts[i])) for i, (doc_name, _) in enumerate(docs)]
+
+
+# Normalized name -> position index for the entities list merge_extraction last merged
+# into, so a run of merges (e.g. change-log replay) doesn't rebuild it each time.
+# Rebuilt when a different list comes in or the list changed size behind our back.
+_entity_index_cache = {"entities": None, "size": None, "index": None}
+_entity_index_lock = threading.Lock()
+
+
+def _entity_index(entities: list) -> dict:
+    """Normalized name -> entity index for entities, reused from the last merge when still valid."""
+    with _entity_index_lock:
+        cache = _entity_index_cache
+        if cache["entities"] is entities and cache["size"] == len(entities):
+            return cache["index"]
+    return {_normalize_name(e.get("name", "")): i for i, e in enumerate(entities)}
+
+
+def _remember_entity_index(entities: list, index: dict):
+    """Keep the index merge_extraction just updated for the next merge into the same list."""
+    with _entity_index_lock:
+        _entity_index_cache.update(entities=entities, size=len(entities), index=index)
 
 
 def merge_extraction(all_data: dict, new_extraction: dict, doc_name: str) -> dict:
@@ -141,8 +548,11 @@ def merge_extraction(all_data: dict, new_extraction: dict, doc_name: str) -> dic
         all_data.setdefault("documents", []).append(doc_name)
     
     # Merge entities with deduplication
-    all_data.setdefault("entities", [])
-    existing_entities = {_normalize_name(e.get("name", "")): i for i, e in enumerate(all_data["entities"])}
+    entities = all_data.setdefault("entities", [])
+    existing_entities = _entity_index(entities)
+    # Mentions of entities touched by this merge, kept as insertion-ordered dicts
+    # and written back as lists once at the end
+    mention_sets = {}
     
     for new_entity in new_extraction.get("entities", []):
         normalized_name = _normalize_name(new_entity.get("name", ""))
@@ -151,9 +561,9 @@ def merge_extraction(all_data: dict, new_extraction: dict, doc_name: str) -> dic
             idx = existing_entities[normalized_name]
             existing = all_data["entities"][idx]
             # Merge mentions
-            existing_mentions = set(existing.get("mentions", []))
-            new_mentions = new_entity.get("mentions", [])
-            existing["mentions"] = list(existing_mentions | set(new_mentions))
+            if idx not in mention_sets:
+                mention_sets[idx] = dict.fromkeys(existing.get("mentions", []))
+            mention_sets[idx].update(dict.fromkeys(new_entity.get("mentions", [])))
             # Add source if different
             existing_source = existing.get("source", "")
             new_source = new_entity.get("source", "")
@@ -171,6 +581,10 @@ def merge_extraction(all_data: dict, new_extraction: dict, doc_name: str) -> dic
             all_data["entities"].append(new_entity)
             existing_entities[normalized_name] = len(all_data["entities"]) - 1
     
+    for idx, mentions in mention_sets.items():
+        all_data["entities"][idx]["mentions"] = list(mentions)
+    _remember_entity_index(entities, existing_entities)
+    
     # Merge claims
     all_data.setdefault("claims", []).extend(new_extraction.get("claims", []))
     
@@ -183,6 +597,7 @@ def merge_extraction(all_data: dict, new_extraction: dict, doc_name: str) -> dic
     return all_data
 
 
+@lru_cache(maxsize=8192)
 def _normalize_name(name: str) -> str:
     """Normalize entity name for deduplication."""
     if not name:
@@ -192,11 +607,8 @@ def _normalize_name(name: str) -> str:
     return normalized
 
 
-def _names_match(name1: str, name2: str) -> bool:
-    """Check if two names refer to the same entity."""
-    n1 = _normalize_name(name1)
-    n2 = _normalize_name(name2)
-    
+def _normalized_names_match(n1: str, words1: set, n2: str, words2: set) -> bool:
+    """_names_match on already-normalized names and their word sets."""
     if not n1 or not n2:
         return False
     
@@ -206,31 +618,77 @@ def _names_match(name1: str, name2: str) -> bool:
     
     # One contains the other (e.g., "Amanda" in "Amanda Lynn Plasse")
     if n1 in n2 or n2 in n1:
-        # Only match if it's a word boundary (not partial word)
-        words1 = set(n1.split())
-        words2 = set(n2.split())
-        # If all words of one are in the other, it's a match
+        # Only match if it's a word boundary (not partial word):
+        # if all words of one are in the other, it's a match
         if words1.issubset(words2) or words2.issubset(words1):
             return True
     
     return False
 
 
+@lru_cache(maxsize=100_000)
+def _names_match_cached(n1: str, n2: str) -> bool:
+    """Memoized match on a normalized pair; callers pass it sorted so (a, b) and (b, a) share an entry."""
+    return _normalized_names_match(n1, set(n1.split()), n2, set(n2.split()))
+
+
+def _names_match(name1: str, name2: str) -> bool:
+    """Check if two names refer to the same entity."""
+    n1 = _normalize_name(name1)
+    n2 = _normalize_name(name2)
+    return _names_match_cached(min(n1, n2), max(n1, n2))
+
+
 def deduplicate_entities(entities: list) -> list:
-    """Deduplicate a list of entities, merging similar ones."""
+    """
+    Deduplicate a list of entities, merging similar ones.
+    
+    Matching names always share a word, so candidates are looked up in blocks keyed
+    by (type, word) instead of comparing against every merged entity.
+    """
     if not entities:
         return []
     
     merged = []
+    # Normalized name per merged entity, kept in sync with merged
+    merged_names = []
+    # Mentions per merged entity that has absorbed a duplicate, as insertion-ordered
+    # dicts; converted back to lists once at the end
+    mention_sets = {}
+    blocks = defaultdict(list)  # (type, word) -> indices into merged
+    
+    def index_words(idx: int, entity_type: str, words: set):
+        for word in words:
+            block = blocks[(entity_type, word)]
+            if not block or block[-1] != idx:
+                block.append(idx)
     
     for entity in entities:
         name = entity.get("name", "")
         entity_type = entity.get("type", "")
+        normalized = _normalize_name(name)
+        words = set(normalized.split())
         
-        # Find matching existing entity
+        # Find the first matching existing entity among those sharing a word.
+        # The block keys double as an exact negative pre-check: most new entities
+        # share no (type, word) with anything merged so far and skip matching entirely.
         match_idx = None
-        for i, existing in enumerate(merged):
-            if existing.get("type", "") == entity_type and _names_match(name, existing.get("name", "")):
+        block_keys = [(entity_type, word) for word in words if (entity_type, word) in blocks]
+        candidates = {i for key in block_keys for i in blocks[key]} if block_keys else ()
+        if candidates:
+            # token_set_ratio scores 100 exactly when one word set contains the other,
+            # so rapidfuzz screens the block in C and only survivors get the full check
+            hits = process.extract(
+                normalized,
+                {i: merged_names[i] for i in candidates},
+                scorer=fuzz.token_set_ratio,
+                score_cutoff=100,
+                limit=None,
+            )
+            candidates = sorted(i for _, _, i in hits)
+        for i in candidates:
+            existing_normalized = merged_names[i]
+            if _names_match_cached(min(normalized, existing_normalized), max(normalized, existing_normalized)):
                 match_idx = i
                 break
         
@@ -238,9 +696,9 @@ def deduplicate_entities(entities: list) -> list:
             # Merge with existing
             existing = merged[match_idx]
             # Merge mentions
-            existing_mentions = set(existing.get("mentions", []))
-            new_mentions = entity.get("mentions", [])
-            existing["mentions"] = list(existing_mentions | set(new_mentions))
+            if match_idx not in mention_sets:
+                mention_sets[match_idx] = dict.fromkeys(existing.get("mentions", []))
+            mention_sets[match_idx].update(dict.fromkeys(entity.get("mentions", [])))
             # Merge sources
             existing_source = existing.get("source", "")
             new_source = entity.get("source", "")
@@ -257,12 +715,19 @@ def deduplicate_entities(entities: list) -> list:
             # Keep the longer/more complete name
             if len(name) > len(existing.get("name", "")):
                 existing["name"] = name
+                merged_names[match_idx] = normalized
+                index_words(match_idx, entity_type, words)
             # Keep longer description
             if len(entity.get("description", "")) > len(existing.get("description", "")):
                 existing["description"] = entity["description"]
         else:
             # Add as new
             merged.append(entity.copy())
+            merged_names.append(normalized)
+            index_words(len(merged) - 1, entity_type, words)
+    
+    for idx, mentions in mention_sets.items():
+        merged[idx]["mentions"] = list(mentions)
     
     return merged
 
@@ -285,29 +750,29 @@ def detect_conflicts(all_data: dict, client: OpenAI = None, model: str = None) -
     if len(claims) < 2:
         return conflicts
     
-    # Group claims by subject (normalized)
-    by_subject = defaultdict(list)
+    # Group claims by subject (normalized), tracking sources and distinct claim
+    # texts in the same pass
+    by_subject = {}
     for claim in claims:
-        subject = claim.get("subject", "").lower().strip()
+        subject = _normalize_name(claim.get("subject", ""))
         if subject:
-            by_subject[subject].append(claim)
-    
-    # Find subjects with multiple claims from different sources
-    for subject, subject_claims in by_subject.items():
-        sources = set(c.get("source", "") for c in subject_claims)
-        
-        if len(sources) > 1 or len(subject_claims) > 1:
-            # Multiple claims about the same subject - potential conflict
-            unique_claim_texts = set(c.get("claim", "").lower() for c in subject_claims)
-            
-            if len(unique_claim_texts) > 1:
-                conflicts.append({
-                    "subject": subject,
-                    "type": "potential_inconsistency",
-                    "claims": subject_claims,
-                    "sources": list(sources),
-                    "description": f"Multiple different claims about '{subject}' found across documents"
-                })
+            group = by_subject.get(subject)
+            if group is None:
+                group = by_subject[subject] = {"claims": [], "sources": {}, "texts": set()}
+            group["claims"].append(claim)
+            group["sources"][claim.get("source", "")] = None
+            group["texts"].add(claim.get("claim", "").lower())
+    
+    # Multiple different claims about the same subject - potential conflict
+    for subject, group in by_subject.items():
+        if len(group["texts"]) > 1:
+            conflicts.append({
+                "subject": subject,
+                "type": "potential_inconsistency",
+                "claims": group["claims"],
+                "sources": list(group["sources"]),
+                "description": f"Multiple different claims about '{subject}' found across documents"
+            })
     
     # If we have an LLM client, do deeper conflict analysis
     if client and model and claims:
@@ -317,26 +782,16 @@ def detect_conflicts(all_data: dict, client: OpenAI = None, model: str = None) -
     return conflicts
 
 
-def _detect_conflicts_with_llm(client: OpenAI, model: str, claims: list) -> list:
-    """Use LLM to detect semantic conflicts between claims."""
-    
-    if len(claims) < 2:
-        return []
-    
-    # Limit claims to avoid token limits
-    claims_sample = claims[:50]
-    
-    prompt = """Analyze these claims extracted from investigation documents.
+# Claims sent to the LLM for conflict analysis; the prompt is built with a single join
+CONFLICT_CLAIMS_LIMIT = 50
+
+_CONFLICTS_PROMPT_HEADER = """Analyze these claims extracted from investigation documents.
 Identify any CONTRADICTIONS or INCONSISTENCIES between claims.
 
 Claims:
 """
-    for i, claim in enumerate(claims_sample):
-        prompt += f"\n{i+1}. [{claim.get('source', 'unknown')}] {claim.get('subject', 'unknown')}: {claim.get('claim', '')}"
-        if claim.get('quote'):
-            prompt += f' (Quote: "{claim.get("quote")[:100]}...")'
-    
-    prompt += """
+
+_CONFLICTS_PROMPT_FOOTER = """
 
 Return ONLY valid JSON array of conflicts found:
 [
@@ -349,27 +804,30 @@ Return ONLY valid JSON array of conflicts found:
 
 If no conflicts found, return empty array: []
 """
+
+
+def _detect_conflicts_with_llm(client: OpenAI, model: str, claims: list) -> list:
+    """Use LLM to detect semantic conflicts between claims."""
+    
+    if len(claims) < 2:
+        return []
+    
+    # Limit claims to avoid token limits
+    claims_sample = claims[:CONFLICT_CLAIMS_LIMIT]
+    
+    parts = [_CONFLICTS_PROMPT_HEADER]
+    for i, claim in enumerate(claims_sample):
+        parts.append(f"\n{i+1}. [{claim.get('source', 'unknown')}] {claim.get('subject', 'unknown')}: {claim.get('claim', '')}")
+        if claim.get('quote'):
+            parts.append(f' (Quote: "{claim.get("quote")[:100]}...")')
+    parts.append(_CONFLICTS_PROMPT_FOOTER)
+    prompt = "".join(parts)
     
     try:
-        resp = client.responses.create(model=model, input=prompt)
-        response_text = resp.output_text.strip()
+        resp = _create_response(client, model=model, input=prompt)
+        response_text = _strip_code_fence(resp.output_text.strip())
         
-        # Handle markdown code blocks
-        if response_text.startswith("```"):
-            lines = response_text.split("\n")
-            json_lines = []
-            in_json = False
-            for line in lines:
-                if line.startswith("```") and not in_json:
-                    in_json = True
-                    continue
-                elif line.startswith("```") and in_json:
-                    break
-                elif in_json:
-                    json_lines.append(line)
-            response_text = "\n".join(json_lines)
-        
-        llm_conflicts = json.loads(response_text)
+        llm_conflicts = orjson.loads(response_text)
         
         # Enrich with actual claim data
         enriched = []
@@ -386,10 +844,8 @@ If no conflicts found, return empty array: []
         return []
 
 
-def remove_document_extraction(doc_name: str) -> dict:
-    """Remove all extracted data for a specific document."""
-    all_data = load_extracted()
-    
+def _remove_document(all_data: dict, doc_name: str) -> dict:
+    """Remove all extracted data for a document from all_data in place."""
     # Remove document from list
     if doc_name in all_data.get("documents", []):
         all_data["documents"].remove(doc_name)
@@ -410,14 +866,30 @@ def remove_document_extraction(doc_name: str) -> dict:
     # Clear conflicts (will be recalculated)
     all_data["conflicts"] = []
     
-    save_extracted(all_data)
+    return all_data
+
+
+def remove_document_extraction(doc_name: str) -> dict:
+    """Remove all extracted data for a specific document."""
+    all_data = _remove_document(load_extracted(mutable=True), doc_name)
+    _append_log({"doc": doc_name, "removed": True})
     return all_data
 
 
 def get_extraction_summary(all_data: dict = None) -> dict:
     """Get a summary of extracted data."""
     if all_data is None:
-        all_data = load_extracted()
+        key = _extracted_files_key()
+        if _extracted_cache["key"] == key:
+            all_data = _extracted_cache["data"]
+        elif _has_pending_log() or not EXTRACTED_PATH.exists():
+            all_data = load_extracted()
+        else:
+            # Counting streams the whole snapshot, so keep the counts until it changes
+            if _summary_cache["key"] != key:
+                _summary_cache["counts"] = _count_snapshot_sections()
+                _summary_cache["key"] = key
+            return dict(_summary_cache["counts"])
     
     return {
         "documents": len(all_data.get("documents", [])),
@@ -428,3 +900,23 @@ def get_extraction_summary(all_data: dict = None) -> dict:
         "key_facts": len(all_data.get("key_facts", []))
     }
 
+
+_summary_cache = {"key": None, "counts": None}
+_SUMMARY_SECTIONS = ("documents", "entities", "claims", "events", "conflicts", "key_facts")
+# ijson events that open a list item (end_map/end_array share the prefix and are skipped)
+_ITEM_START_EVENTS = frozenset(("start_map", "start_array", "string", "number", "boolean", "null"))
+
+
+def _count_snapshot_sections() -> dict:
+    """Count the top-level lists of the snapshot in one streaming pass without building them."""
+    counts = dict.fromkeys(_SUMMARY_SECTIONS, 0)
+    prefixes = {f"{section}.item": section for section in _SUMMARY_SECTIONS}
+    try:
+        with open(EXTRACTED_PATH, "rb") as f:
+            for prefix, event, _ in ijson.parse(f):
+                section = prefixes.get(prefix)
+                if section is not None and event in _ITEM_START_EVENTS:
+                    counts[section] += 1
+    except ijson.JSONError:
+        return dict.fromkeys(_SUMMARY_SECTIONS, 0)
+    return counts
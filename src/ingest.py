@@ -1,7 +1,12 @@
 from pathlib import Path
+from typing import Optional
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from openai import OpenAI
+import os
+import hashlib
 import tempfile
 import shutil
+from .ratelimit import rate_limited
 
 def is_scanned_pdf(pdf_path: Path) -> bool:
     """
@@ -13,12 +18,19 @@ def is_scanned_pdf(pdf_path: Path) -> bool:
         doc = fitz.open(pdf_path)
         text_length = 0
         page_count = len(doc)
-        for page in doc:
-            text_length += len(page.get_text().strip())
-        doc.close()
-        
         # If very little text extracted, it's likely scanned
-        # Threshold: less than 100 chars per page on average
+        # Threshold: less than 100 chars per page on average. Stop reading as soon
+        # as the total already guarantees the average is met.
+        needed = 100 * max(page_count, 1)
+        try:
+            for page in doc:
+                # flags=0 skips ligature/whitespace post-processing; we only count characters
+                text_length += len(page.get_text("text", flags=0).strip())
+                if text_length >= needed:
+                    return False
+        finally:
+            doc.close()
+        
         avg_chars_per_page = text_length / max(page_count, 1)
         return avg_chars_per_page < 100
     except ImportError:
@@ -27,9 +39,12 @@ def is_scanned_pdf(pdf_path: Path) -> bool:
             import pdfplumber
             text_length = 0
             with pdfplumber.open(pdf_path) as pdf:
+                needed = 100 * max(len(pdf.pages), 1)
                 for page in pdf.pages:
                     text = page.extract_text() or ""
                     text_length += len(text.strip())
+                    if text_length >= needed:
+                        return False
                 avg_chars_per_page = text_length / max(len(pdf.pages), 1)
             return avg_chars_per_page < 100
         except ImportError:
@@ -38,27 +53,97 @@ def is_scanned_pdf(pdf_path: Path) -> bool:
             return False
 
 
-def ocr_pdf_to_text(pdf_path: Path) -> str:
-    """OCR a scanned PDF and return the extracted text."""
-    from pdf2image import convert_from_path
-    import pytesseract
+def ocr_pdf_to_text(pdf_path: Path, pool: Optional[Executor] = None) -> str:
+    """
+    OCR a scanned PDF and return the extracted text. Pages go through ocr_pdf_page,
+    one page per task on pool (a process pool initialized with init_ocr_worker, whose
+    size bounds OCR parallelism); without a pool they are OCR'd in this process.
+    """
+    import fitz  # PyMuPDF
     
     print(f"  📄 OCR processing: {pdf_path.name}")
-    images = convert_from_path(pdf_path, dpi=300)
+    with fitz.open(pdf_path) as doc:
+        page_count = len(doc)
+    
+    page_numbers = range(1, page_count + 1)
+    if pool is None:
+        texts = (ocr_pdf_page(pdf_path, i) for i in page_numbers)
+    else:
+        texts = pool.map(ocr_pdf_page, [pdf_path] * page_count, page_numbers, chunksize=1)
     
     full_text = []
-    for i, image in enumerate(images):
-        print(f"    Page {i+1}/{len(images)}...", end=" ", flush=True)
-        text = pytesseract.image_to_string(image)
-        full_text.append(f"--- Page {i+1} ---\n{text}")
-        print(f"({len(text)} chars)")
+    for i, text in zip(page_numbers, texts):
+        print(f"    Page {i}/{page_count}... ({len(text)} chars)")
+        full_text.append(f"--- Page {i} ---\n{text}")
     
     return "\n\n".join(full_text)
 
 
-def prepare_file_for_upload(file_path: Path, temp_dir: Path) -> Path:
+# Pages are OCR'd at OCR_DPI (fewer pixels, much faster); pages yielding under
+# OCR_MIN_CHARS characters, e.g. small print, are retried at OCR_RETRY_DPI
+OCR_DPI = 200
+OCR_RETRY_DPI = 300
+OCR_MIN_CHARS = 50
+
+# Tesseract engine of this OCR worker process, loaded once and reused for every page
+_tess_api = None
+
+
+def _get_tess_api():
+    global _tess_api
+    if _tess_api is None:
+        from tesserocr import PyTessBaseAPI
+        # Tesseract's default engine and page segmentation (full layout analysis),
+        # as with the tesseract command line
+        _tess_api = PyTessBaseAPI(lang="eng")
+    return _tess_api
+
+
+def limit_ocr_threads() -> None:
+    """
+    Process pool initializer: one OpenMP thread per tesseract run. Parallelism comes
+    from the pool's processes, and tesseract's own threads would only compete with them.
+    Must run before tesseract is loaded in the process.
+    """
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+
+def init_ocr_worker() -> None:
+    """Process pool initializer: load the tesseract engine before the first page arrives."""
+    limit_ocr_threads()
+    try:
+        _get_tess_api()
+    except ImportError:
+        # Reported by ocr_pdf_page; failing here would break the whole pool
+        pass
+
+
+def ocr_pdf_page(pdf_path: Path, page_number: int) -> str:
+    """
+    Render and OCR a single PDF page (1-based). Lives at module level so process
+    pools can run one page per worker without shipping page images between processes.
     """
-    Prepare a file for upload. If it's a scanned PDF, OCR it first.
+    import fitz  # PyMuPDF
+    from PIL import Image
+    
+    api = _get_tess_api()
+    # Rasterize in-process (grayscale) rather than via poppler and temp files
+    with fitz.open(pdf_path) as doc:
+        page = doc[page_number - 1]
+        text = ""
+        for dpi in (OCR_DPI, OCR_RETRY_DPI):
+            pix = page.get_pixmap(matrix=fitz.Matrix(dpi / 72, dpi / 72), colorspace=fitz.csGRAY)
+            api.SetImage(Image.frombytes("L", (pix.width, pix.height), pix.samples))
+            text = api.GetUTF8Text()
+            if len(text.strip()) >= OCR_MIN_CHARS:
+                break
+    return text
+
+
+def prepare_file_for_upload(file_path: Path, temp_dir: Path, ocr_pool: Optional[Executor] = None) -> Path:
+    """
+    Prepare a file for upload. If it's a scanned PDF, OCR it first (pages on ocr_pool,
+    see ocr_pdf_to_text).
     Returns the path to upload (original or OCR'd version).
     """
     if file_path.suffix.lower() != '.pdf':
@@ -69,7 +154,7 @@ def prepare_file_for_upload(file_path: Path, temp_dir: Path) -> Path:
         print(f"  🔍 Detected scanned PDF: {file_path.name}")
         
         # OCR it
-        text = ocr_pdf_to_text(file_path)
+        text = ocr_pdf_to_text(file_path, ocr_pool)
         
         # Save as text file
         txt_path = temp_dir / f"{file_path.stem}.txt"
@@ -82,55 +167,131 @@ def prepare_file_for_upload(file_path: Path, temp_dir: Path) -> Path:
         return file_path
 
 
-def upload_files(client: OpenAI, docs_dir: Path, auto_ocr: bool = True) -> list[str]:
+def file_sha256(path: Path) -> str:
+    """Content hash used to skip re-uploading unchanged documents."""
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+@rate_limited
+def _create_file(client: OpenAI, upload_path: Path):
+    with open(upload_path, "rb") as fh:
+        return client.files.create(file=fh, purpose="assistants")
+
+
+def upload_files(
+    client: OpenAI,
+    docs_dir: Path,
+    auto_ocr: bool = True,
+    file_hashes: Optional[dict] = None,
+    max_workers: int = 8,
+) -> list[str]:
     """
     Upload files to OpenAI. Automatically OCRs scanned PDFs if auto_ocr=True.
+    
+    If file_hashes ({sha256: file_id}) is given, files whose content hash is already
+    recorded are skipped, and newly uploaded files are added to it in place.
+    Files are prepared (OCR) in parallel processes and uploaded concurrently.
     """
-    file_ids = []
+    if file_hashes is None:
+        file_hashes = {}
+    
+    # Collect the files to upload up front so they can be dispatched in parallel
+    pending = []
+    for p in sorted(docs_dir.glob("*")):
+        if not p.is_file():
+            continue
+        
+        # Skip already-processed text versions of PDFs
+        if p.suffix == '.txt' and (docs_dir / f"{p.stem}.pdf").exists():
+            print(f"  ⏭️  Skipping {p.name} (PDF version exists)")
+            continue
+        
+        digest = file_sha256(p)
+        if digest in file_hashes:
+            print(f"  ⏭️  Skipping {p.name} (already uploaded as {file_hashes[digest]})")
+            continue
+        
+        pending.append((p, digest))
     
     # Create temp directory for OCR'd files
     temp_dir = Path(tempfile.mkdtemp(prefix="ocr_"))
     
+    def upload(p: Path, upload_path: Path) -> str:
+        f = _create_file(client, upload_path)
+        print(f"  ☁️  Uploaded {p.name}: {f.id}")
+        return f.id
+    
+    # Pipeline: files are prepared concurrently, and each prepared file is handed
+    # straight to the upload threads so OCR of one file overlaps the network upload
+    # of another. OCR itself runs page by page on one process pool shared by all
+    # files, so at most one tesseract per core runs however many scans there are.
+    uploaded = [None] * len(pending)
     try:
-        for p in sorted(docs_dir.glob("*")):
-            if not p.is_file():
-                continue
-            
-            # Skip already-processed text versions of PDFs
-            if p.suffix == '.txt' and (docs_dir / f"{p.stem}.pdf").exists():
-                print(f"  ⏭️  Skipping {p.name} (PDF version exists)")
-                continue
-                
-            print(f"\nProcessing: {p.name}")
-            
-            # Prepare file (OCR if needed)
+        with ProcessPoolExecutor(max_workers=os.cpu_count(), initializer=init_ocr_worker) as ocr_pool, \
+                ThreadPoolExecutor(max_workers=max_workers) as prep_pool, \
+                ThreadPoolExecutor(max_workers=max_workers) as upload_pool:
+            upload_futures = {}
             if auto_ocr:
-                upload_path = prepare_file_for_upload(p, temp_dir)
+                prep_futures = {
+                    prep_pool.submit(prepare_file_for_upload, p, temp_dir, ocr_pool): i
+                    for i, (p, _) in enumerate(pending)
+                }
+                for future in as_completed(prep_futures):
+                    i = prep_futures[future]
+                    upload_futures[upload_pool.submit(upload, pending[i][0], future.result())] = i
             else:
-                upload_path = p
-            
-            # Upload to OpenAI
-            f = client.files.create(file=open(upload_path, "rb"), purpose="assistants")
-            file_ids.append(f.id)
-            print(f"  ☁️  Uploaded: {f.id}")
+                for i, (p, _) in enumerate(pending):
+                    upload_futures[upload_pool.submit(upload, p, p)] = i
             
+            for future in as_completed(upload_futures):
+                i = upload_futures[future]
+                uploaded[i] = future.result()
+                file_hashes[pending[i][1]] = uploaded[i]
     finally:
         # Cleanup temp directory
         shutil.rmtree(temp_dir, ignore_errors=True)
     
+    file_ids = [file_id for file_id in uploaded if file_id is not None]
     return file_ids
 
+@rate_limited
+def _attach_file(client: OpenAI, vector_store_id: str, file_id: str):
+    return client.vector_stores.files.create(vector_store_id=vector_store_id, file_id=file_id)
+
+
 def attach_files_to_vector_store(client: OpenAI, vector_store_id: str, file_ids: list[str]) -> None:
-    # simplest: attach individually (cookbook does this, parallelizable if you want)
-    for fid in file_ids:
-        client.vector_stores.files.create(vector_store_id=vector_store_id, file_id=fid)
+    # One file batch request attaches everything server-side (and waits for indexing);
+    # fall back to concurrent per-file attaches if the batch endpoint fails.
+    if not file_ids:
+        return
+    try:
+        batch = client.vector_stores.file_batches.create_and_poll(
+            vector_store_id=vector_store_id, file_ids=file_ids
+        )
+        if batch.file_counts.failed:
+            print(f"  Warning: {batch.file_counts.failed} file(s) failed to index")
+        return
+    except Exception as e:
+        print(f"  File batch attach failed ({e}), attaching files individually")
+    
+    with ThreadPoolExecutor(max_workers=16) as ex:
+        list(ex.map(lambda fid: _attach_file(client, vector_store_id, fid), file_ids))
 
-def wait_until_ready(client: OpenAI, vector_store_id: str, max_checks: int = 60) -> None:
+def wait_until_ready(client: OpenAI, vector_store_id: str, max_checks: int = 60, max_delay: float = 8.0) -> None:
     # The docs recommend waiting until file status is `completed` before querying.
+    # Poll with exponential backoff (0.5, 1, 2, 4, 8, 8, ... s) + jitter: small uploads
+    # are detected quickly, large ones don't hammer the endpoint.
     import time
+    import random
+    delay = 0.5
     for _ in range(max_checks):
         vs = client.vector_stores.retrieve(vector_store_id)
+        if vs.status == "expired":
+            raise RuntimeError(f"Vector store {vector_store_id} has expired")
         if vs.file_counts.in_progress == 0:
+            if vs.file_counts.failed:
+                print(f"  Warning: {vs.file_counts.failed} file(s) failed to index")
             return
-        time.sleep(2)
+        time.sleep(delay + random.uniform(0, delay * 0.1))
+        delay = min(delay * 2, max_delay)
     raise TimeoutError("Vector store still indexing after wait period")
\ No newline at end of file
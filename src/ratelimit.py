@@ -0,0 +1,115 @@
+"""
+Rate limiting for OpenAI API calls.
+Bounds concurrent requests and requests-per-minute, and retries 429/503 responses
+with exponential backoff so parallel worker fan-out doesn't fail under load.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from functools import wraps
+import openai
+from .config import OPENAI_MAX_CONCURRENCY, OPENAI_RPM
+
+MAX_RETRIES = 5
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+
+
+class RateLimiter:
+    """
+    Context manager combining a concurrency semaphore with a sliding-window
+    requests-per-minute cap (deque of recent request timestamps).
+    """
+
+    def __init__(self, max_concurrent: int, rpm: int = 0):
+        self._semaphore = threading.Semaphore(max(max_concurrent, 1))
+        self._rpm = rpm
+        self._timestamps = deque()
+        self._lock = threading.Lock()
+
+    def _wait_for_slot(self):
+        """Block until a request fits within the per-minute window."""
+        if self._rpm <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._timestamps and now - self._timestamps[0] >= 60:
+                    self._timestamps.popleft()
+                if len(self._timestamps) < self._rpm:
+                    self._timestamps.append(now)
+                    return
+                wait = 60 - (now - self._timestamps[0])
+            time.sleep(wait)
+
+    def __enter__(self):
+        self._semaphore.acquire()
+        try:
+            self._wait_for_slot()
+        except BaseException:
+            self._semaphore.release()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._semaphore.release()
+        return False
+
+
+# Process-wide limiter shared by every OpenAI call site
+limiter = RateLimiter(OPENAI_MAX_CONCURRENCY, OPENAI_RPM)
+
+
+def _is_retryable(error: Exception) -> bool:
+    """429s and 503s are transient; everything else is surfaced immediately."""
+    if isinstance(error, openai.RateLimitError):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code == 503
+
+
+def _retry_delay(attempt: int) -> float:
+    """Exponential backoff plus jitter for the given (0-based) retry attempt."""
+    return min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt + random.uniform(0, RETRY_BASE_DELAY))
+
+
+def rate_limited(fn):
+    """
+    Decorator: run fn under the shared limiter, retrying rate-limit/overload
+    errors with exponential backoff plus jitter.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                with limiter:
+                    return fn(*args, **kwargs)
+            except Exception as e:
+                if attempt >= MAX_RETRIES or not _is_retryable(e):
+                    raise
+                delay = _retry_delay(attempt)
+                print(f"OpenAI request throttled ({type(e).__name__}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+    return wrapper
+
+
+def async_retrying(fn):
+    """
+    Decorator for coroutine functions (AsyncOpenAI calls on the event loop): the same
+    429/503 retries as rate_limited, sleeping with asyncio. The shared limiter is
+    thread-based and isn't taken here.
+    """
+    @wraps(fn)
+    async def wrapper(*args, **kwargs):
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                return await fn(*args, **kwargs)
+            except Exception as e:
+                if attempt >= MAX_RETRIES or not _is_retryable(e):
+                    raise
+                delay = _retry_delay(attempt)
+                print(f"OpenAI request throttled ({type(e).__name__}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+    return wrapper
@@ -8,33 +8,131 @@ Routing strategy:
 """
 
 import re
-from typing import Tuple, Optional, List
-from openai import OpenAI
-from .extract import load_extracted, get_extraction_summary
+import asyncio
+import hashlib
+import ahocorasick
+from dataclasses import dataclass
+from typing import Tuple, Optional, List, Union
+from openai import OpenAI, AsyncOpenAI
+from . import router_cache
+from .client import get_client
+from .semcache import exhaustive_cache
+from .extract import load_extracted, get_extraction_summary, iter_entities
+from .batch import run_responses_batch
 
 
-def _synthesize_response(
-    client: OpenAI,
-    model: str,
-    question: str,
-    raw_data: str,
-    category: str
-) -> str:
-    """
-    Use LLM to synthesize a natural, well-organized response from extracted data.
-    
-    Args:
-        client: OpenAI client
-        model: Model to use
-        question: Original user question
-        raw_data: Template-formatted extracted data
-        category: Query category (conflicts, entities, events, summary, general)
-    
-    Returns:
-        Synthesized natural language response
-    """
-    
-    system_prompt = """You are an investigative analyst assistant. Your job is to take structured extracted data and synthesize it into a clear, professional response that directly answers the user's question.
+# Patterns that indicate entity lookup
+_ENTITY_LOOKUP_PATTERNS = [
+    r'^who is\b',
+    r'^who was\b', 
+    r'^who are\b',
+    r'^what is (?:the )?\w+(?:\'s| of)\b',  # "what is John's role"
+    r'^tell me about\b',
+    r'^what do (?:we|you) know about\b',
+    r'^information (?:on|about)\b',
+    r'^details (?:on|about)\b',
+    r'^background on\b',
+    r'^profile of\b',
+    r'^describe\b',
+    r'\bwho\b.*\bmentioned\b',
+    r'\bwhat\b.*\brole\b',
+]
+
+# Patterns indicating need for deep document analysis
+_DEEP_ANALYSIS_PATTERNS = [
+    r'why did\b',
+    r'why was\b',
+    r'how did\b',
+    r'what happened\b.*\bwhen\b',
+    r'what.*\bsay about\b',
+    r'what.*\btestif',
+    r'what.*\bstate\b',
+    r'what.*\bclaim\b',
+    r'explain.*\brelationship\b',
+    r'connection between\b',
+    r'evidence\b.*\b(?:that|of|for)\b',
+    r'prove\b',
+    r'according to\b',
+    r'what does.*\b(?:document|report|interview)\b.*\bsay\b',
+    r'quote\b',
+    r'exact\b.*\bword',
+    r'specific.*\bdetail',
+    r'context\b.*\bof\b',
+    r'circumstances\b',
+    r'motive\b',
+    r'reason\b.*\bfor\b',
+]
+
+# Each pattern list compiled once into a single alternation
+_ENTITY_LOOKUP_RE = re.compile("|".join(f"(?:{p})" for p in _ENTITY_LOOKUP_PATTERNS))
+_DEEP_ANALYSIS_RE = re.compile("|".join(f"(?:{p})" for p in _DEEP_ANALYSIS_PATTERNS))
+# Quoted strings or capitalized word sequences, in one pass. Quotes must not touch a
+# word character so possessive apostrophes ("Roman's ... Bob's") don't open a span
+# that swallows the names between them.
+_NAME_RE = re.compile(
+    r'(?<!\w)["\'](?P<quoted>[^"\']+)["\'](?!\w)'
+    r'|\b(?P<proper_noun>[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\b'
+)
+_PUNCT_RE = re.compile(r'[^\w\s]')
+
+# Substring keywords, matched against the lowercased question
+_COMPREHENSIVE_KEYWORDS = [
+    "all ", "every ", "list ", "find all", "show all", "give me all",
+    "inconsistencies", "contradictions", "conflicts", "discrepancies",
+    "everyone", "everything", "everybody",
+    "summarize all", "summary of all", "summarize the",
+    "how many", "count ",
+    "complete list", "full list",
+    "all people", "all entities", "all events",
+    "timeline", "chronology", "sequence of events",
+    "overview", "what do we know",
+    "what entities", "what people", "what events",
+    "list the ", "list all",
+]
+
+_CATEGORY_KEYWORDS = {
+    "conflicts": ["inconsisten", "contradict", "conflict", "discrepan"],
+    "entities": [
+        "people", "person", "everyone", "who", "entities", "organizations",
+        "names", "name", "individuals", "suspects", "witnesses", "victims",
+        # Entity lookup phrases
+        "tell me about", "information on", "details on", "background on",
+        "profile of", "what do we know about", "describe",
+    ],
+    "events": ["timeline", "events", "when", "chronolog", "sequence", "dates"],
+    "summary": ["summarize", "summary", "overview", "everything"],
+}
+
+
+def _build_keyword_automaton() -> ahocorasick.Automaton:
+    """One Aho-Corasick automaton mapping every keyword to the categories it signals."""
+    keyword_categories = {}
+    for keyword in _COMPREHENSIVE_KEYWORDS:
+        keyword_categories.setdefault(keyword, set()).add("comprehensive")
+    for category, keywords in _CATEGORY_KEYWORDS.items():
+        for keyword in keywords:
+            keyword_categories.setdefault(keyword, set()).add(category)
+    
+    automaton = ahocorasick.Automaton()
+    for keyword, categories in keyword_categories.items():
+        automaton.add_word(keyword, frozenset(categories))
+    automaton.make_automaton()
+    return automaton
+
+
+_KEYWORD_AUTOMATON = _build_keyword_automaton()
+
+
+def _keyword_categories(question_lower: str) -> set:
+    """All keyword categories present in the text, found in a single pass."""
+    categories = set()
+    for _, found in _KEYWORD_AUTOMATON.iter(question_lower):
+        categories |= found
+    return categories
+
+
+# Instructions for turning template-formatted extracted data into the final answer
+_SYNTHESIS_SYSTEM_PROMPT = """You are an investigative analyst assistant. Your job is to take structured extracted data and synthesize it into a clear, professional response that directly answers the user's question.
 
 MARKDOWN FORMATTING RULES (CRITICAL):
 - Use ## for main section headers (with blank line after)
@@ -68,6 +166,9 @@ CRITICAL ANTI-HALLUCINATION RULES:
 - Do not fill gaps with assumptions or general knowledge
 - When uncertain, state "The documents do not specify..." rather than guessing"""
 
+
+def _synthesis_input(question: str, raw_data: str, category: str) -> list:
+    """Build the Responses API input for synthesizing an answer from extracted data."""
     user_prompt = f"""User's Question: {question}
 
 Query Category: {category}
@@ -76,25 +177,149 @@ Extracted Data:
 {raw_data}
 
 Based on the extracted data above, provide a well-organized response using proper markdown formatting. Synthesize the information into a coherent narrative that directly answers the user's question."""
+    return [
+        {"role": "system", "content": _SYNTHESIS_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+def _semantic_scope(model: str, raw_data: str, category: str) -> str:
+    """Semantic-cache scope: a paraphrase only reuses an answer built from the same data and category."""
+    return f"{model}|{category}|{hashlib.sha256(raw_data.encode()).hexdigest()}"
 
+
+def _synthesize_response(
+    client: OpenAI,
+    model: str,
+    question: str,
+    raw_data: str,
+    category: str
+) -> str:
+    """
+    Use LLM to synthesize a natural, well-organized response from extracted data.
+    
+    Args:
+        client: OpenAI client
+        model: Model to use
+        question: Original user question
+        raw_data: Template-formatted extracted data
+        category: Query category (conflicts, entities, events, summary, general)
+    
+    Returns:
+        Synthesized natural language response
+    """
+    # Identical question + data gives the same answer; serve repeats from the cache
+    cache_key = router_cache.make_key(model, question, raw_data)
+    cached = router_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    # Then paraphrases of an earlier question over the same data
+    scope = _semantic_scope(model, raw_data, category)
+    embedding = exhaustive_cache.embed(client, question)
+    if embedding is not None:
+        cached = exhaustive_cache.lookup(scope, embedding)
+        if cached is not None:
+            return cached
+    
     try:
-        resp = client.responses.create(
-            model=model,
-            input=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ]
-        )
-        return resp.output_text.strip()
+        resp = client.responses.create(model=model, input=_synthesis_input(question, raw_data, category))
+        response = resp.output_text.strip()
     except Exception as e:
         print(f"LLM synthesis error: {e}")
         # Fall back to raw data if synthesis fails
         return raw_data
+    
+    router_cache.put(cache_key, response, model)
+    if embedding is not None:
+        exhaustive_cache.add(scope, embedding, response)
+    return response
+
+
+async def _synthesize_response_async(
+    client: AsyncOpenAI,
+    model: str,
+    question: str,
+    raw_data: str,
+    category: str
+) -> str:
+    """_synthesize_response on an AsyncOpenAI client, so concurrent queries overlap their API calls."""
+    cache_key = router_cache.make_key(model, question, raw_data)
+    cached = await asyncio.to_thread(router_cache.get, cache_key)
+    if cached is not None:
+        return cached
+    
+    # The semantic cache embeds with the shared sync client; all cache I/O stays off the event loop
+    scope = _semantic_scope(model, raw_data, category)
+    embedding = await asyncio.to_thread(exhaustive_cache.embed, get_client(), question)
+    if embedding is not None:
+        cached = await asyncio.to_thread(exhaustive_cache.lookup, scope, embedding)
+        if cached is not None:
+            return cached
+    
+    try:
+        resp = await client.responses.create(model=model, input=_synthesis_input(question, raw_data, category))
+        response = resp.output_text.strip()
+    except Exception as e:
+        print(f"LLM synthesis error: {e}")
+        return raw_data
+    
+    await asyncio.to_thread(router_cache.put, cache_key, response, model)
+    if embedding is not None:
+        await asyncio.to_thread(exhaustive_cache.add, scope, embedding, response)
+    return response
+
+
+def synthesize_responses_batch(
+    client: OpenAI,
+    model: str,
+    items: List[Tuple[str, str, str]],
+    poll_interval: float = 30
+) -> List[str]:
+    """
+    Synthesize many answers through the OpenAI Batch API (half price, minutes-to-hours latency).
+    For offline/bulk workflows only.
+    
+    Args:
+        items: (question, raw_data, category) triples
+    
+    Returns: synthesized responses in the same order; an item whose request failed
+        falls back to its raw_data, as in _synthesize_response
+    """
+    if not items:
+        return []
+    
+    requests = [
+        (f"q-{i}", {"model": model, "input": _synthesis_input(question, raw_data, category)})
+        for i, (question, raw_data, category) in enumerate(items)
+    ]
+    _, outputs, errors = run_responses_batch(client, requests, "synthesis", poll_interval)
+    
+    for custom_id, error in errors.items():
+        print(f"Synthesis batch request {custom_id} failed: {error}")
+    return [
+        outputs[f"q-{i}"].strip() if f"q-{i}" in outputs else raw_data
+        for i, (_, raw_data, _) in enumerate(items)
+    ]
 
 
 def _normalize_for_matching(text: str) -> str:
     """Normalize text for entity matching."""
-    return re.sub(r'[^\w\s]', '', text.lower()).strip()
+    return _PUNCT_RE.sub('', text.lower()).strip()
+
+
+# Record separator: whitespace to _PUNCT_RE (so it survives substitution) but never in names
+_BATCH_SEP = "\x1e"
+
+
+def _normalize_names_batch(names: List[str]) -> List[str]:
+    """_normalize_for_matching over many names with one lower() and one regex pass."""
+    if not names:
+        return []
+    joined = _BATCH_SEP.join(names)
+    if joined.count(_BATCH_SEP) != len(names) - 1:
+        return [_normalize_for_matching(name) for name in names]
+    return [part.strip() for part in _PUNCT_RE.sub('', joined.lower()).split(_BATCH_SEP)]
 
 
 def _extract_potential_names(question: str) -> List[str]:
@@ -102,162 +327,261 @@ def _extract_potential_names(question: str) -> List[str]:
     Extract potential entity names from a question.
     Looks for capitalized words (proper nouns) and quoted strings.
     """
-    names = []
-    
-    # Extract quoted strings
-    quoted = re.findall(r'["\']([^"\']+)["\']', question)
-    names.extend(quoted)
+    quoted = []
+    # Capitalized word sequences like "John Smith", "Detective Roman", "Amanda Lynn Plasse"
+    capitalized = []
+    for match in _NAME_RE.finditer(question):
+        if match.lastgroup == "quoted":
+            quoted.append(match.group("quoted"))
+        else:
+            capitalized.append(match.group("proper_noun"))
     
-    # Extract capitalized word sequences (proper nouns)
-    # Match sequences like "John Smith", "Detective Roman", "Amanda Lynn Plasse"
-    capitalized = re.findall(r'\b([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\b', question)
-    names.extend(capitalized)
+    # Quoted strings first, as the most deliberate names
+    names = quoted + capitalized
     
     return names
 
 
+# Titles and common words that show up capitalized in questions ("Who is...",
+# "Detective ...") but don't identify anyone on their own
+_GENERIC_WORDS = frozenset({
+    # Titles and roles
+    "detective", "det", "officer", "ofc", "sergeant", "sgt", "lieutenant", "lt",
+    "captain", "capt", "chief", "deputy", "sheriff", "trooper", "agent", "inspector",
+    "doctor", "dr", "mr", "mrs", "ms", "miss", "prof", "professor", "judge",
+    "attorney", "counsel", "witness", "victim", "suspect", "defendant",
+    # Question words and common sentence starters
+    "who", "what", "when", "where", "why", "how", "which", "is", "was", "are",
+    "the", "a", "an", "of", "and", "or", "in", "on", "at", "to", "for", "about",
+    "tell", "list", "show", "give", "find", "describe", "did", "does", "do",
+    "i", "me", "we", "you", "he", "she", "they", "it", "this", "that", "there",
+})
+
+# Single-slot cache of the index for the most recently matched entities list
+_entity_index_cache = {"entities": None, "size": None, "index": None}
+
+
+def _build_entity_index(entities: List[dict]) -> dict:
+    """
+    Normalize every entity name once: parallel lists of normalized names and word sets,
+    plus inverted indexes from word and from full normalized name to entity positions.
+    Also precomputes the per-type and deduplicated entity listings.
+    """
+    norms, words = [], []
+    by_word, by_norm = {}, {}
+    for i, normalized in enumerate(_normalize_names_batch([e.get("name", "") for e in entities])):
+        entity_words = frozenset(normalized.split())
+        norms.append(normalized)
+        words.append(entity_words)
+        by_norm.setdefault(normalized, []).append(i)
+        for word in entity_words:
+            by_word.setdefault(word, []).append(i)
+    
+    # Entities per lowercased type, and the listings deduplicated by case-insensitive
+    # name (first occurrence wins) - overall and within each type
+    by_type, unique, unique_by_type = {}, [], {}
+    seen_names, seen_names_by_type = set(), {}
+    for entity in entities:
+        entity_type = entity.get("type", "").lower()
+        by_type.setdefault(entity_type, []).append(entity)
+        name_lower = entity.get("name", "").lower()
+        if not name_lower:
+            continue
+        if name_lower not in seen_names:
+            seen_names.add(name_lower)
+            unique.append(entity)
+        type_seen = seen_names_by_type.setdefault(entity_type, set())
+        if name_lower not in type_seen:
+            type_seen.add(name_lower)
+            unique_by_type.setdefault(entity_type, []).append(entity)
+    
+    return {
+        "norms": norms, "words": words, "by_word": by_word, "by_norm": by_norm,
+        "by_type": by_type, "unique": unique, "unique_by_type": unique_by_type,
+    }
+
+
+def _get_entity_index(entities: List[dict]) -> dict:
+    """Return the index for entities, rebuilding it only when a different list is passed."""
+    cache = _entity_index_cache
+    if cache["entities"] is not entities or cache["size"] != len(entities):
+        cache["index"] = _build_entity_index(entities)
+        cache["entities"] = entities
+        cache["size"] = len(entities)
+    return cache["index"]
+
+
 def _find_matching_entities(names: List[str], entities: List[dict]) -> List[dict]:
     """
     Find entities that match any of the given names.
     Uses fuzzy matching to handle partial names.
     """
-    matches = []
+    name_norms = _normalize_names_batch(names)
+    return _match_names(name_norms, [frozenset(n.split()) for n in name_norms], entities)
+
+
+def _match_names(name_norms: List[str], name_sets: List[frozenset], entities: List[dict]) -> List[dict]:
+    """
+    Find entities matching already-normalized names and their word sets.
     
-    for name in names:
-        name_normalized = _normalize_for_matching(name)
-        name_words = set(name_normalized.split())
+    Every match rule needs a shared word (or an identical normalized name), so only
+    entities found through the inverted indexes are checked.
+    """
+    matches = []
+    seen = set()  # positions already in matches
+    index = _get_entity_index(entities)
+    norms, words = index["norms"], index["words"]
+    
+    for name_normalized, name_words in zip(name_norms, name_sets):
+        candidates = set(index["by_norm"].get(name_normalized, ()))
+        # A lone title or common word ("Detective", "Who") would partially match every
+        # entity containing it; such a name only matches an entity with exactly that name
+        generic = len(name_words) == 1 and name_words <= _GENERIC_WORDS
+        if not generic:
+            for word in name_words:
+                candidates.update(index["by_word"].get(word, ()))
         
-        for entity in entities:
-            entity_name = entity.get("name", "")
-            entity_normalized = _normalize_for_matching(entity_name)
-            entity_words = set(entity_normalized.split())
-            
-            # Exact match
-            if name_normalized == entity_normalized:
-                if entity not in matches:
-                    matches.append(entity)
-                continue
-            
-            # Partial match - all words in query name appear in entity name
-            if name_words and name_words.issubset(entity_words):
-                if entity not in matches:
-                    matches.append(entity)
-                continue
-            
-            # Partial match - entity name words appear in query
-            if entity_words and entity_words.issubset(name_words):
-                if entity not in matches:
-                    matches.append(entity)
+        for i in sorted(candidates):
+            if i in seen:
                 continue
+            entity_normalized = norms[i]
+            entity_words = words[i]
             
-            # Single word match for single-word queries (first or last name)
-            if len(name_words) == 1 and len(entity_words) > 1:
-                if name_words & entity_words:  # Any overlap
-                    if entity not in matches:
-                        matches.append(entity)
+            # (A single-word name sharing a word with the entity is the first
+            # partial-match rule, so first or last names are covered there.)
+            if (
+                # Exact match
+                name_normalized == entity_normalized
+                # Partial match - all words in query name appear in entity name
+                or (name_words and name_words.issubset(entity_words))
+                # Partial match - entity name words appear in query
+                or (entity_words and entity_words.issubset(name_words))
+            ):
+                seen.add(i)
+                matches.append(entities[i])
     
     return matches
 
 
-def _is_entity_lookup_query(question: str) -> bool:
+@dataclass(slots=True)
+class QueryContext:
+    """A question preprocessed once: lowercased, with its candidate names normalized."""
+    raw: str
+    lower: str
+    names: List[str]
+    name_norms: List[str]
+    name_sets: List[frozenset]
+
+
+def make_query_context(question: Union[str, QueryContext]) -> QueryContext:
+    """Preprocess a question for routing; an existing QueryContext is returned as is."""
+    if isinstance(question, QueryContext):
+        return question
+    names = _extract_potential_names(question)
+    name_norms = _normalize_names_batch(names)
+    return QueryContext(
+        raw=question,
+        lower=question.lower().strip(),
+        names=names,
+        name_norms=name_norms,
+        name_sets=[frozenset(n.split()) for n in name_norms],
+    )
+
+
+def _is_entity_lookup_query(ctx: QueryContext) -> bool:
     """
     Determine if a question is primarily an entity lookup.
     These should go to the knowledge graph, not vector search.
     """
-    question_lower = question.lower().strip()
-    
-    # Patterns that indicate entity lookup
-    entity_lookup_patterns = [
-        r'^who is\b',
-        r'^who was\b', 
-        r'^who are\b',
-        r'^what is (?:the )?\w+(?:\'s| of)\b',  # "what is John's role"
-        r'^tell me about\b',
-        r'^what do (?:we|you) know about\b',
-        r'^information (?:on|about)\b',
-        r'^details (?:on|about)\b',
-        r'^background on\b',
-        r'^profile of\b',
-        r'^describe\b',
-        r'\bwho\b.*\bmentioned\b',
-        r'\bwhat\b.*\brole\b',
-    ]
-    
-    for pattern in entity_lookup_patterns:
-        if re.search(pattern, question_lower):
-            return True
-    
-    return False
+    return bool(_ENTITY_LOOKUP_RE.search(ctx.lower))
 
 
-def _is_comprehensive_query(question: str) -> bool:
+def _is_comprehensive_query(ctx: QueryContext) -> bool:
     """
     Determine if a question requires comprehensive/exhaustive data.
     These should go to the knowledge graph.
     """
-    question_lower = question.lower().strip()
-    
-    comprehensive_keywords = [
-        "all ", "every ", "list ", "find all", "show all", "give me all",
-        "inconsistencies", "contradictions", "conflicts", "discrepancies",
-        "everyone", "everything", "everybody",
-        "summarize all", "summary of all", "summarize the",
-        "how many", "count ",
-        "complete list", "full list",
-        "all people", "all entities", "all events",
-        "timeline", "chronology", "sequence of events",
-        "overview", "what do we know",
-        "what entities", "what people", "what events",
-        "list the ", "list all",
-    ]
-    
-    for keyword in comprehensive_keywords:
-        if keyword in question_lower:
-            return True
-    
-    return False
+    return "comprehensive" in _keyword_categories(ctx.lower)
 
 
-def _is_deep_analysis_query(question: str) -> bool:
+def _is_deep_analysis_query(ctx: QueryContext) -> bool:
     """
     Determine if a question requires deep analysis (vector + CoA).
     These need to search the actual documents for nuanced answers.
     """
-    question_lower = question.lower().strip()
-    
-    # Patterns indicating need for deep document analysis
-    deep_analysis_patterns = [
-        r'why did\b',
-        r'why was\b',
-        r'how did\b',
-        r'what happened\b.*\bwhen\b',
-        r'what.*\bsay about\b',
-        r'what.*\btestif',
-        r'what.*\bstate\b',
-        r'what.*\bclaim\b',
-        r'explain.*\brelationship\b',
-        r'connection between\b',
-        r'evidence\b.*\b(?:that|of|for)\b',
-        r'prove\b',
-        r'according to\b',
-        r'what does.*\b(?:document|report|interview)\b.*\bsay\b',
-        r'quote\b',
-        r'exact\b.*\bword',
-        r'specific.*\bdetail',
-        r'context\b.*\bof\b',
-        r'circumstances\b',
-        r'motive\b',
-        r'reason\b.*\bfor\b',
-    ]
+    return bool(_DEEP_ANALYSIS_RE.search(ctx.lower))
+
+
+def route(question: Union[str, QueryContext], extracted_data: dict = None) -> Tuple[str, str, List[dict]]:
+    """
+    Classify a query and pick its response category in a single pass.
+    
+    The question is preprocessed into a QueryContext once (callers can pass their own
+    to reuse it for answering), keyword-scanned once, and names are matched against the
+    graph at most once; classify_query and get_query_category are views of this result.
+    
+    Returns: (routing, category, matching_entities)
+        routing: "EXHAUSTIVE" or "SPECIFIC" (see classify_query)
+        category: "conflicts", "entities", "events", "summary", or "general"
+        matching_entities: graph entities named in the question
+    """
+    ctx = make_query_context(question)
+    categories = _keyword_categories(ctx.lower)
+    potential_names = ctx.names
     
-    for pattern in deep_analysis_patterns:
-        if re.search(pattern, question_lower):
-            return True
+    # Data is only needed to look up names mentioned in the question
+    matching_entities = []
+    if potential_names:
+        if extracted_data is None:
+            extracted_data = load_extracted()
+        matching_entities = _match_names(ctx.name_norms, ctx.name_sets, extracted_data.get("entities", []))
     
-    return False
+    # 1. Comprehensive queries always go to knowledge graph
+    if "comprehensive" in categories:
+        routing = "EXHAUSTIVE"
+    # 2. Check for entity lookup patterns
+    elif _is_entity_lookup_query(ctx):
+        if extracted_data is not None:
+            has_entities = bool(extracted_data.get("entities"))
+        else:
+            # Without names we only need to know whether any entity exists
+            has_entities = next(iter_entities(), None) is not None
+        
+        if not has_entities:
+            routing = "SPECIFIC"
+        elif potential_names:
+            if matching_entities:
+                # Entity found in knowledge graph - use it
+                print(f"Router: Found {len(matching_entities)} matching entities in graph for: {potential_names}")
+                routing = "EXHAUSTIVE"
+            else:
+                # Entity not in graph - need to search documents
+                print(f"Router: No matching entities found for: {potential_names}, using vector search")
+                routing = "SPECIFIC"
+        else:
+            # Generic entity query without specific name - use graph
+            routing = "EXHAUSTIVE"
+    # 3. Deep analysis queries need vector search, and 4. everything else defaults
+    # to SPECIFIC - CoA handles uncertainty well
+    else:
+        routing = "SPECIFIC"
+    
+    if "conflicts" in categories:
+        category = "conflicts"
+    # Entity keywords/lookup phrases, or the question mentions a known entity name
+    elif "entities" in categories or matching_entities:
+        category = "entities"
+    elif "events" in categories:
+        category = "events"
+    elif "summary" in categories:
+        category = "summary"
+    else:
+        category = "general"
+    
+    return routing, category, matching_entities
 
 
-def classify_query(question: str, extracted_data: dict = None) -> str:
+def classify_query(question: Union[str, QueryContext], extracted_data: dict = None) -> str:
     """
     Classify a query to determine optimal routing.
     
@@ -273,103 +597,28 @@ def classify_query(question: str, extracted_data: dict = None) -> str:
     3. Deep analysis queries → SPECIFIC (need document context)
     4. Default → SPECIFIC (CoA handles uncertainty well)
     """
-    question_lower = question.lower().strip()
-    
-    # 1. Comprehensive queries always go to knowledge graph
-    if _is_comprehensive_query(question):
-        return "EXHAUSTIVE"
-    
-    # 2. Check for entity lookup patterns
-    if _is_entity_lookup_query(question):
-        # Load extracted data if not provided
-        if extracted_data is None:
-            extracted_data = load_extracted()
-        
-        entities = extracted_data.get("entities", [])
-        
-        if entities:
-            # Extract potential entity names from question
-            potential_names = _extract_potential_names(question)
-            
-            if potential_names:
-                # Check if any mentioned entities exist in our graph
-                matching_entities = _find_matching_entities(potential_names, entities)
-                
-                if matching_entities:
-                    # Entity found in knowledge graph - use it
-                    print(f"Router: Found {len(matching_entities)} matching entities in graph for: {potential_names}")
-                    return "EXHAUSTIVE"
-                else:
-                    # Entity not in graph - need to search documents
-                    print(f"Router: No matching entities found for: {potential_names}, using vector search")
-                    return "SPECIFIC"
-            else:
-                # Generic entity query without specific name - use graph
-                return "EXHAUSTIVE"
-    
-    # 3. Deep analysis queries need vector search
-    if _is_deep_analysis_query(question):
-        return "SPECIFIC"
-    
-    # 4. Default to SPECIFIC - CoA handles uncertainty well
-    return "SPECIFIC"
+    return route(question, extracted_data)[0]
 
 
-def get_query_category(question: str, extracted_data: dict = None) -> str:
+def get_query_category(question: Union[str, QueryContext], extracted_data: dict = None) -> str:
     """
     Get more detailed category for exhaustive queries to determine response type.
     
     Returns: "conflicts", "entities", "events", "summary", or "general"
     """
-    question_lower = question.lower()
-    
-    if any(kw in question_lower for kw in ["inconsisten", "contradict", "conflict", "discrepan"]):
-        return "conflicts"
-    
-    # Check for entity-related queries
-    entity_keywords = ["people", "person", "everyone", "who", "entities", "organizations", 
-                       "names", "name", "individuals", "suspects", "witnesses", "victims"]
-    entity_patterns = ["tell me about", "information on", "details on", "background on", 
-                       "profile of", "what do we know about", "describe"]
-    
-    if any(kw in question_lower for kw in entity_keywords):
-        return "entities"
-    
-    if any(pattern in question_lower for pattern in entity_patterns):
-        return "entities"
-    
-    # Check if question mentions a known entity name
-    if extracted_data is None:
-        extracted_data = load_extracted()
-    
-    potential_names = _extract_potential_names(question)
-    if potential_names:
-        entities = extracted_data.get("entities", [])
-        if _find_matching_entities(potential_names, entities):
-            return "entities"
-    
-    if any(kw in question_lower for kw in ["timeline", "events", "when", "chronolog", "sequence", "dates"]):
-        return "events"
-    
-    if any(kw in question_lower for kw in ["summarize", "summary", "overview", "everything"]):
-        return "summary"
-    
-    return "general"
+    return route(question, extracted_data)[1]
 
 
-def answer_exhaustive_query(
-    question: str,
-    extracted_data: dict = None,
-    client: OpenAI = None,
-    model: str = None
-) -> Tuple[str, bool]:
+def _exhaustive_raw_response(
+    ctx: QueryContext,
+    extracted_data: Optional[dict],
+    category: Optional[str],
+    matching_entities: Optional[List[dict]]
+) -> Tuple[str, bool, Optional[str]]:
     """
-    Answer a query using preprocessed extracted data.
-    
-    If client and model are provided, uses LLM to synthesize a natural response.
-    Otherwise, returns template-formatted data.
+    Template-formatted answer from extracted data.
     
-    Returns: (response_text, success)
+    Returns: (raw_response, success, category); category is None when there is no data yet
     """
     if extracted_data is None:
         extracted_data = load_extracted()
@@ -377,25 +626,76 @@ def answer_exhaustive_query(
     # Check if we have any data
     summary = get_extraction_summary(extracted_data)
     if summary["documents"] == 0:
-        return ("No documents have been processed yet. Please upload documents first.", False)
+        return ("No documents have been processed yet. Please upload documents first.", False, None)
     
-    category = get_query_category(question, extracted_data)
+    if category is None:
+        _, category, matching_entities = route(ctx, extracted_data)
     
     # Generate template-based response
     if category == "conflicts":
         raw_response, success = _answer_conflicts_query(extracted_data)
     elif category == "entities":
-        raw_response, success = _answer_entities_query(question, extracted_data)
+        raw_response, success = _answer_entities_query(ctx, extracted_data, matching_entities)
     elif category == "events":
         raw_response, success = _answer_events_query(extracted_data)
     elif category == "summary":
         raw_response, success = _answer_summary_query(extracted_data)
     else:
-        raw_response, success = _answer_general_exhaustive(question, extracted_data)
+        raw_response, success = _answer_general_exhaustive(ctx.raw, extracted_data)
+    
+    return raw_response, success, category
+
+
+def answer_exhaustive_query(
+    question: Union[str, QueryContext],
+    extracted_data: dict = None,
+    client: OpenAI = None,
+    model: str = None,
+    category: str = None,
+    matching_entities: List[dict] = None
+) -> Tuple[str, bool]:
+    """
+    Answer a query using preprocessed extracted data.
+    
+    If client and model are provided, uses LLM to synthesize a natural response.
+    Otherwise, returns template-formatted data.
+    Callers that already ran route() can pass its category and matching_entities, and
+    the QueryContext they routed with as the question.
+    
+    Returns: (response_text, success)
+    """
+    ctx = make_query_context(question)
+    raw_response, success, category = _exhaustive_raw_response(
+        ctx, extracted_data, category, matching_entities
+    )
     
     # If client provided, synthesize a natural response
     if client and model and success:
-        synthesized = _synthesize_response(client, model, question, raw_response, category)
+        synthesized = _synthesize_response(client, model, ctx.raw, raw_response, category)
+        return (synthesized, True)
+    
+    return (raw_response, success)
+
+
+async def answer_exhaustive_query_async(
+    question: Union[str, QueryContext],
+    extracted_data: dict = None,
+    client: AsyncOpenAI = None,
+    model: str = None,
+    category: str = None,
+    matching_entities: List[dict] = None
+) -> Tuple[str, bool]:
+    """
+    answer_exhaustive_query with an AsyncOpenAI client: the synthesis call is awaited
+    instead of blocking a thread, so concurrent exhaustive queries overlap.
+    """
+    ctx = make_query_context(question)
+    raw_response, success, category = _exhaustive_raw_response(
+        ctx, extracted_data, category, matching_entities
+    )
+    
+    if client and model and success:
+        synthesized = await _synthesize_response_async(client, model, ctx.raw, raw_response, category)
         return (synthesized, True)
     
     return (raw_response, success)
@@ -420,45 +720,50 @@ def _answer_conflicts_query(data: dict) -> Tuple[str, bool]:
             True
         )
     
-    response = "## Detected Inconsistencies & Conflicts\n\n"
-    response += f"Found **{len(conflicts)}** potential inconsistencies across the documents:\n\n"
+    parts = ["## Detected Inconsistencies & Conflicts\n\n"]
+    parts.append(f"Found **{len(conflicts)}** potential inconsistencies across the documents:\n\n")
     
     for i, conflict in enumerate(conflicts, 1):
-        response += f"### {i}. {conflict.get('subject', 'Unknown Subject').title()}\n\n"
-        response += f"**Type:** {conflict.get('type', 'potential_inconsistency').replace('_', ' ').title()}\n\n"
+        parts.append(f"### {i}. {conflict.get('subject', 'Unknown Subject').title()}\n\n")
+        parts.append(f"**Type:** {conflict.get('type', 'potential_inconsistency').replace('_', ' ').title()}\n\n")
         
         if conflict.get("description"):
-            response += f"{conflict['description']}\n\n"
+            parts.append(f"{conflict['description']}\n\n")
         
-        response += "**Conflicting Claims:**\n\n"
+        parts.append("**Conflicting Claims:**\n\n")
         for claim in conflict.get("claims", []):
             source = claim.get("source", "Unknown source")
             claim_text = claim.get("claim", "No claim text")
             quote = claim.get("quote", "")
             
-            response += f"**{source}:** {claim_text}\n\n"
+            parts.append(f"**{source}:** {claim_text}\n\n")
             if quote:
-                response += f"> \"{quote[:200]}{'...' if len(quote) > 200 else ''}\"\n\n"
+                parts.append(f"> \"{quote[:200]}{'...' if len(quote) > 200 else ''}\"\n\n")
         
-        response += "---\n\n"
+        parts.append("---\n\n")
     
-    return (response, True)
+    return ("".join(parts), True)
 
 
-def _answer_entities_query(question: str, data: dict) -> Tuple[str, bool]:
+def _answer_entities_query(
+    ctx: QueryContext,
+    data: dict,
+    matching_entities: List[dict] = None
+) -> Tuple[str, bool]:
     """Generate response for entity queries - both specific lookups and listing."""
     
     entities = data.get("entities", [])
     claims = data.get("claims", [])
-    question_lower = question.lower()
+    question_lower = ctx.lower
     
     # First, check if this is a specific entity lookup
-    potential_names = _extract_potential_names(question)
+    potential_names = ctx.names
     if potential_names:
-        matching_entities = _find_matching_entities(potential_names, entities)
+        if matching_entities is None:
+            matching_entities = _match_names(ctx.name_norms, ctx.name_sets, entities)
         
         if matching_entities:
-            return _answer_specific_entity_query(question, matching_entities, claims, data)
+            return _answer_specific_entity_query(ctx.raw, matching_entities, claims, data)
         else:
             # Names were mentioned but NOT found in documents - fail gracefully
             names_str = ", ".join(f'"{name}"' for name in potential_names)
@@ -466,40 +771,41 @@ def _answer_entities_query(question: str, data: dict) -> Tuple[str, bool]:
                 f"## No Information Found\n\n"
                 f"I searched the documents but could not find any information about {names_str}.\n\n"
                 f"The following people ARE mentioned in the documents:\n\n" +
-                "\n".join(f"- **{e.get('name')}**" for e in entities if e.get('type', '').lower() == 'person')[:15] +
+                "\n".join(f"- **{e.get('name')}**" for e in _get_entity_index(entities)["by_type"].get("person", []))[:15] +
                 "\n\n*If you're looking for someone specific, please check the spelling or try a different name.*",
                 True
             )
     
-    # Otherwise, handle as a listing query
+    # Otherwise, handle as a listing query, using the deduplicated listings precomputed
+    # once per extracted data version
+    index = _get_entity_index(entities)
+    
     # Filter by type if specified
     if any(kw in question_lower for kw in ["people", "person", "everyone", "names", "name", "individuals", "suspects", "witnesses", "victims"]):
-        filtered = [e for e in entities if e.get("type", "").lower() == "person"]
+        type_key = "person"
         entity_type = "People"
     elif "organization" in question_lower or "compan" in question_lower:
-        filtered = [e for e in entities if e.get("type", "").lower() == "organization"]
+        type_key = "organization"
         entity_type = "Organizations"
     elif "location" in question_lower or "place" in question_lower:
-        filtered = [e for e in entities if e.get("type", "").lower() == "location"]
+        type_key = "location"
         entity_type = "Locations"
     else:
-        filtered = entities
+        type_key = None
         entity_type = "Entities"
     
-    if not filtered:
-        return (f"No {entity_type.lower()} were identified in the documents.", True)
+    if type_key is None:
+        any_found = bool(entities)
+        unique_entities = index["unique"]
+    else:
+        any_found = type_key in index["by_type"]
+        unique_entities = index["unique_by_type"].get(type_key, [])
     
-    # Deduplicate by name (case-insensitive)
-    seen_names = set()
-    unique_entities = []
-    for e in filtered:
-        name_lower = e.get("name", "").lower()
-        if name_lower and name_lower not in seen_names:
-            seen_names.add(name_lower)
-            unique_entities.append(e)
+    if not any_found:
+        return (f"No {entity_type.lower()} were identified in the documents.", True)
     
-    response = f"## {entity_type} Mentioned in Documents\n\n"
-    response += f"Found **{len(unique_entities)}** unique {entity_type.lower()}:\n\n"
+    parts = [f"## {entity_type} Mentioned in Documents\n\n"]
+    parts.append(f"Found **{len(unique_entities)}** unique {entity_type.lower()}:\n\n")
     
     for entity in unique_entities:
         name = entity.get("name", "Unknown")
@@ -507,21 +813,142 @@ def _answer_entities_query(question: str, data: dict) -> Tuple[str, bool]:
         source = entity.get("source", "Unknown source")
         entity_type_str = entity.get("type", "")
         
-        response += f"### {name}"
+        parts.append(f"### {name}")
         if entity_type_str and entity_type_str.lower() != entity_type.lower().rstrip('s'):
-            response += f" ({entity_type_str})"
-        response += "\n\n"
+            parts.append(f" ({entity_type_str})")
+        parts.append("\n\n")
         
         if desc:
-            response += f"{desc}\n\n"
+            parts.append(f"{desc}\n\n")
         
         # Format source
         if isinstance(source, list):
-            response += f"*Sources: {', '.join(source)}*\n\n"
+            parts.append(f"*Sources: {', '.join(source)}*\n\n")
         else:
-            response += f"*Source: {source}*\n\n"
+            parts.append(f"*Source: {source}*\n\n")
     
-    return (response, True)
+    return ("".join(parts), True)
+
+
+# Joins fields scanned in one pass; _normalize_for_matching strips it, so no name spans it
+_FIELD_SEP = "\x00"
+
+
+def _find_related(
+    entities: List[dict],
+    claims: List[dict],
+    events: List[dict]
+) -> Tuple[List[List[dict]], List[List[dict]]]:
+    """
+    Related claims and events for each entity, scanning every item once for all entities.
+    
+    A claim is related if the entity's normalized name or any of its words occurs in the
+    claim's subject or text. An event is related if they occur in its description, or the
+    full name occurs in one of its people_involved.
+    """
+    claims_by_entity = [[] for _ in entities]
+    events_by_entity = [[] for _ in entities]
+    
+    # pattern -> {entity index: is full name}
+    patterns = {}
+    # An empty normalized name is a substring of everything
+    match_all = set()
+    for idx, entity in enumerate(entities):
+        entity_name_lower = _normalize_for_matching(entity.get("name", "Unknown"))
+        if not entity_name_lower:
+            match_all.add(idx)
+            continue
+        patterns.setdefault(entity_name_lower, {})[idx] = True
+        for word in entity_name_lower.split():
+            patterns.setdefault(word, {}).setdefault(idx, False)
+    
+    automaton = None
+    if patterns:
+        automaton = ahocorasick.Automaton()
+        for pattern, owners in patterns.items():
+            automaton.add_word(pattern, tuple(owners.items()))
+        automaton.make_automaton()
+    
+    def hits(text: str, full_name_only: bool = False) -> set:
+        found = set(match_all)
+        if automaton is not None:
+            for _, owners in automaton.iter(text):
+                for idx, is_full_name in owners:
+                    if is_full_name or not full_name_only:
+                        found.add(idx)
+        return found
+    
+    for claim in claims:
+        text = claim.get("subject", "").lower() + _FIELD_SEP + claim.get("claim", "").lower()
+        for idx in hits(text):
+            claims_by_entity[idx].append(claim)
+    
+    for event in events:
+        found = hits(event.get("description", "").lower())
+        people = event.get("people_involved", [])
+        if people and automaton is not None:
+            found |= hits(_FIELD_SEP.join(p.lower() for p in people), full_name_only=True)
+        for idx in found:
+            events_by_entity[idx].append(event)
+    
+    return claims_by_entity, events_by_entity
+
+
+def _format_entity_section(entity: dict, related_claims: List[dict], related_events: List[dict]) -> str:
+    """Format one entity's section: details, direct mentions, related claims and events."""
+    parts = []
+    
+    name = entity.get("name", "Unknown")
+    entity_type = entity.get("type", "")
+    desc = entity.get("description", "")
+    source = entity.get("source", "Unknown source")
+    mentions = entity.get("mentions", [])
+    
+    parts.append(f"## {name}")
+    if entity_type:
+        parts.append(f" ({entity_type})")
+    parts.append("\n\n")
+    
+    if desc:
+        parts.append(f"{desc}\n\n")
+    
+    # Format source(s)
+    if isinstance(source, list):
+        parts.append(f"**Sources:** {', '.join(source)}\n\n")
+    else:
+        parts.append(f"**Source:** {source}\n\n")
+    
+    # Add mentions/quotes if available
+    if mentions:
+        parts.append("### Direct Mentions\n\n")
+        for mention in mentions[:5]:  # Limit to 5
+            if mention:
+                parts.append(f"> \"{mention[:300]}{'...' if len(mention) > 300 else ''}\"\n\n")
+    
+    # Related claims about this entity
+    if related_claims:
+        parts.append("### Related Claims\n\n")
+        for claim in related_claims[:10]:  # Limit to 10
+            claim_text = claim.get("claim", "")
+            claim_source = claim.get("source", "Unknown")
+            quote = claim.get("quote", "")
+            
+            parts.append(f"**{claim_text}**\n\n")
+            if quote:
+                parts.append(f"> \"{quote[:200]}{'...' if len(quote) > 200 else ''}\"\n\n")
+            parts.append(f"*Source: {claim_source}*\n\n---\n\n")
+    
+    # Related events
+    if related_events:
+        parts.append("### Related Events\n\n")
+        for event in related_events[:5]:  # Limit to 5
+            date = event.get("date", "Unknown date")
+            event_desc = event.get("description", "")
+            event_source = event.get("source", "Unknown")
+            
+            parts.append(f"**{date}**\n\n{event_desc}\n\n*Source: {event_source}*\n\n---\n\n")
+    
+    return "".join(parts)
 
 
 def _answer_specific_entity_query(
@@ -535,83 +962,9 @@ def _answer_specific_entity_query(
     Aggregates entity info, related claims, and events.
     """
     
-    response = ""
-    
-    for entity in matching_entities:
-        name = entity.get("name", "Unknown")
-        entity_type = entity.get("type", "")
-        desc = entity.get("description", "")
-        source = entity.get("source", "Unknown source")
-        mentions = entity.get("mentions", [])
-        
-        response += f"## {name}"
-        if entity_type:
-            response += f" ({entity_type})"
-        response += "\n\n"
-        
-        if desc:
-            response += f"{desc}\n\n"
-        
-        # Format source(s)
-        if isinstance(source, list):
-            response += f"**Sources:** {', '.join(source)}\n\n"
-        else:
-            response += f"**Source:** {source}\n\n"
-        
-        # Add mentions/quotes if available
-        if mentions:
-            response += "### Direct Mentions\n\n"
-            for mention in mentions[:5]:  # Limit to 5
-                if mention:
-                    response += f"> \"{mention[:300]}{'...' if len(mention) > 300 else ''}\"\n\n"
-        
-        # Find related claims about this entity
-        entity_name_lower = _normalize_for_matching(name)
-        entity_words = set(entity_name_lower.split())
-        
-        related_claims = []
-        for claim in claims:
-            subject = claim.get("subject", "").lower()
-            claim_text = claim.get("claim", "").lower()
-            
-            # Check if entity is mentioned in subject or claim
-            if entity_name_lower in subject or entity_name_lower in claim_text:
-                related_claims.append(claim)
-            elif entity_words and any(word in subject or word in claim_text for word in entity_words):
-                related_claims.append(claim)
-        
-        if related_claims:
-            response += "### Related Claims\n\n"
-            for claim in related_claims[:10]:  # Limit to 10
-                claim_text = claim.get("claim", "")
-                claim_source = claim.get("source", "Unknown")
-                quote = claim.get("quote", "")
-                
-                response += f"**{claim_text}**\n\n"
-                if quote:
-                    response += f"> \"{quote[:200]}{'...' if len(quote) > 200 else ''}\"\n\n"
-                response += f"*Source: {claim_source}*\n\n---\n\n"
-        
-        # Find related events
-        events = data.get("events", [])
-        related_events = []
-        for event in events:
-            people = [p.lower() for p in event.get("people_involved", [])]
-            desc_lower = event.get("description", "").lower()
-            
-            if entity_name_lower in desc_lower or any(word in desc_lower for word in entity_words):
-                related_events.append(event)
-            elif any(_normalize_for_matching(name) in p for p in people for name_part in entity_words):
-                related_events.append(event)
-        
-        if related_events:
-            response += "### Related Events\n\n"
-            for event in related_events[:5]:  # Limit to 5
-                date = event.get("date", "Unknown date")
-                event_desc = event.get("description", "")
-                event_source = event.get("source", "Unknown")
-                
-                response += f"**{date}**\n\n{event_desc}\n\n*Source: {event_source}*\n\n---\n\n"
+    # Claims and events are scanned once for all entities; each section is then just formatting
+    claims_by_entity, events_by_entity = _find_related(matching_entities, claims, data.get("events", []))
+    response = "".join(map(_format_entity_section, matching_entities, claims_by_entity, events_by_entity))
     
     if not response:
         return ("No information found for the specified entity.", False)
@@ -619,6 +972,32 @@ def _answer_specific_entity_query(
     return (response, True)
 
 
+_sorted_events_cache = {"events": None, "size": None, "sorted": None}
+
+
+def _sort_events(events: List[dict]) -> List[dict]:
+    """Events with a known date in date order, followed by undated ones in original order."""
+    dated, undated = [], []
+    for event in events:
+        date = event.get("date", "")
+        if date and date.lower() != "unknown":
+            dated.append(event)
+        else:
+            undated.append(event)
+    dated.sort(key=lambda e: e["date"])
+    return dated + undated
+
+
+def _get_sorted_events(events: List[dict]) -> List[dict]:
+    """Return events sorted for the timeline, re-sorting only when a different list is passed."""
+    cache = _sorted_events_cache
+    if cache["events"] is not events or cache["size"] != len(events):
+        cache["sorted"] = _sort_events(events)
+        cache["events"] = events
+        cache["size"] = len(events)
+    return cache["sorted"]
+
+
 def _answer_events_query(data: dict) -> Tuple[str, bool]:
     """Generate response for timeline/events queries."""
     
@@ -627,17 +1006,10 @@ def _answer_events_query(data: dict) -> Tuple[str, bool]:
     if not events:
         return ("No dated events were identified in the documents.", True)
     
-    # Sort by date if possible
-    def sort_key(e):
-        date = e.get("date", "")
-        if date and date.lower() != "unknown":
-            return (0, date)
-        return (1, "")
-    
-    sorted_events = sorted(events, key=sort_key)
+    sorted_events = _get_sorted_events(events)
     
-    response = "## Timeline of Events\n\n"
-    response += f"Found **{len(events)}** events:\n\n"
+    parts = ["## Timeline of Events\n\n"]
+    parts.append(f"Found **{len(events)}** events:\n\n")
     
     for event in sorted_events:
         date = event.get("date", "Unknown date")
@@ -646,17 +1018,17 @@ def _answer_events_query(data: dict) -> Tuple[str, bool]:
         location = event.get("location", "")
         source = event.get("source", "Unknown source")
         
-        response += f"### {date}\n\n"
-        response += f"{desc}\n\n"
+        parts.append(f"### {date}\n\n")
+        parts.append(f"{desc}\n\n")
         
         if people:
-            response += f"- **People involved:** {', '.join(people)}\n"
+            parts.append(f"- **People involved:** {', '.join(people)}\n")
         if location:
-            response += f"- **Location:** {location}\n"
+            parts.append(f"- **Location:** {location}\n")
         
-        response += f"\n*Source: {source}*\n\n---\n\n"
+        parts.append(f"\n*Source: {source}*\n\n---\n\n")
     
-    return (response, True)
+    return ("".join(parts), True)
 
 
 def _answer_summary_query(data: dict) -> Tuple[str, bool]:
@@ -665,41 +1037,41 @@ def _answer_summary_query(data: dict) -> Tuple[str, bool]:
     summary = get_extraction_summary(data)
     key_facts = data.get("key_facts", [])
     
-    response = "## Document Summary\n\n"
-    response += "### Overview\n\n"
-    response += f"- **Documents Analyzed:** {summary['documents']}\n"
-    response += f"- **Entities Identified:** {summary['entities']}\n"
-    response += f"- **Claims Extracted:** {summary['claims']}\n"
-    response += f"- **Events Found:** {summary['events']}\n"
-    response += f"- **Potential Conflicts:** {summary['conflicts']}\n\n"
+    parts = ["## Document Summary\n\n"]
+    parts.append("### Overview\n\n")
+    parts.append(f"- **Documents Analyzed:** {summary['documents']}\n")
+    parts.append(f"- **Entities Identified:** {summary['entities']}\n")
+    parts.append(f"- **Claims Extracted:** {summary['claims']}\n")
+    parts.append(f"- **Events Found:** {summary['events']}\n")
+    parts.append(f"- **Potential Conflicts:** {summary['conflicts']}\n\n")
     
     if key_facts:
-        response += "### Key Facts\n\n"
+        parts.append("### Key Facts\n\n")
         for fact in key_facts[:20]:  # Limit to 20
             if isinstance(fact, dict):
-                response += f"- {fact.get('fact', str(fact))} *({fact.get('source', 'unknown')})*\n"
+                parts.append(f"- {fact.get('fact', str(fact))} *({fact.get('source', 'unknown')})*\n")
             else:
-                response += f"- {fact}\n"
+                parts.append(f"- {fact}\n")
         
-        response += "\n"
+        parts.append("\n")
         if len(key_facts) > 20:
-            response += f"*...and {len(key_facts) - 20} more facts*\n\n"
+            parts.append(f"*...and {len(key_facts) - 20} more facts*\n\n")
     
     # Add entity breakdown
     entities = data.get("entities", [])
     if entities:
-        response += "### Entity Breakdown\n\n"
+        parts.append("### Entity Breakdown\n\n")
         by_type = {}
         for e in entities:
             t = e.get("type", "Other")
             by_type[t] = by_type.get(t, 0) + 1
         
         for entity_type, count in sorted(by_type.items(), key=lambda x: -x[1]):
-            response += f"- **{entity_type}:** {count}\n"
+            parts.append(f"- **{entity_type}:** {count}\n")
         
-        response += "\n"
+        parts.append("\n")
     
-    return (response, True)
+    return ("".join(parts), True)
 
 
 def _answer_general_exhaustive(question: str, data: dict) -> Tuple[str, bool]:
@@ -707,23 +1079,23 @@ def _answer_general_exhaustive(question: str, data: dict) -> Tuple[str, bool]:
     
     summary = get_extraction_summary(data)
     
-    response = "## Extracted Data Overview\n\n"
-    response += f"I have preprocessed data from **{summary['documents']}** document(s):\n\n"
-    response += f"- **{summary['entities']}** entities (people, organizations, locations)\n"
-    response += f"- **{summary['claims']}** claims/statements\n"
-    response += f"- **{summary['events']}** events\n"
-    response += f"- **{summary['conflicts']}** potential conflicts detected\n\n"
+    parts = ["## Extracted Data Overview\n\n"]
+    parts.append(f"I have preprocessed data from **{summary['documents']}** document(s):\n\n")
+    parts.append(f"- **{summary['entities']}** entities (people, organizations, locations)\n")
+    parts.append(f"- **{summary['claims']}** claims/statements\n")
+    parts.append(f"- **{summary['events']}** events\n")
+    parts.append(f"- **{summary['conflicts']}** potential conflicts detected\n\n")
     
-    response += "For more specific information, try asking:\n"
-    response += "- \"List all people mentioned\"\n"
-    response += "- \"Show me the timeline of events\"\n"
-    response += "- \"Find all inconsistencies\"\n"
-    response += "- \"Give me a summary of all documents\"\n"
+    parts.append("For more specific information, try asking:\n")
+    parts.append("- \"List all people mentioned\"\n")
+    parts.append("- \"Show me the timeline of events\"\n")
+    parts.append("- \"Find all inconsistencies\"\n")
+    parts.append("- \"Give me a summary of all documents\"\n")
     
-    return (response, True)
+    return ("".join(parts), True)
 
 
-def should_use_extracted_data(question: str, extracted_data: dict = None) -> bool:
+def should_use_extracted_data(question: Union[str, QueryContext], extracted_data: dict = None) -> bool:
     """
     Quick check if a question should use extracted data (knowledge graph).
     Used to determine routing before full classification.
@@ -735,5 +1107,5 @@ def should_use_extracted_data(question: str, extracted_data: dict = None) -> boo
     Returns:
         True if query should use knowledge graph, False for vector search
     """
-    return classify_query(question, extracted_data) == "EXHAUSTIVE"
+    return route(question, extracted_data)[0] == "EXHAUSTIVE"
 
@@ -0,0 +1,59 @@
+"""
+On-disk cache for synthesized exhaustive-query answers.
+Entries are content-addressed: the key hashes everything the answer depends on
+(model, prompt version, question, template-formatted data), so changed extracted
+data simply produces a different key.
+"""
+
+import hashlib
+import time
+from pathlib import Path
+from typing import Optional
+import orjson
+
+ROUTER_CACHE_DIR = Path(".cache/synthesis")
+# Bump when the synthesis prompt changes so old answers aren't served
+SYNTHESIS_PROMPT_VERSION = "v1"
+DEFAULT_TTL = 7 * 24 * 3600
+
+
+def make_key(model: str, question: str, raw_data: str) -> str:
+    """Content hash of a synthesis request."""
+    h = hashlib.sha256()
+    for part in (model, SYNTHESIS_PROMPT_VERSION, question, raw_data):
+        h.update(part.encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def get(key: str) -> Optional[str]:
+    """Return the cached response for key, or None if missing or expired."""
+    path = ROUTER_CACHE_DIR / f"{key}.json"
+    try:
+        entry = orjson.loads(path.read_bytes())
+    except (OSError, orjson.JSONDecodeError):
+        return None
+    if entry.get("expiresAt", 0) < time.time():
+        path.unlink(missing_ok=True)
+        return None
+    return entry.get("response")
+
+
+def put(key: str, response: str, model: str, ttl: float = DEFAULT_TTL) -> None:
+    """Store a response; failures to write are reported and otherwise ignored."""
+    now = time.time()
+    entry = {
+        "inputHash": key,
+        "promptVersion": SYNTHESIS_PROMPT_VERSION,
+        "modelId": model,
+        "response": response,
+        "createdAt": now,
+        "expiresAt": now + ttl,
+    }
+    try:
+        ROUTER_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = ROUTER_CACHE_DIR / f"{key}.json.tmp"
+        tmp_path.write_bytes(orjson.dumps(entry))
+        tmp_path.replace(ROUTER_CACHE_DIR / f"{key}.json")
+    except OSError as e:
+        print(f"Could not cache synthesized response: {e}")
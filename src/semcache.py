@@ -0,0 +1,184 @@
+"""
+Semantic cache for file_search responses.
+Stores embeddings of previously asked questions alongside their response text so
+near-duplicate retrievals (e.g. overlapping worker search focuses) can be reused.
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+import numpy as np
+import orjson
+from openai import OpenAI
+from .ratelimit import rate_limited
+
+SEMCACHE_DIR = Path(".cache/semcache")
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+
+@rate_limited
+def _create_embedding(client: OpenAI, text: str):
+    return client.embeddings.create(model=EMBEDDING_MODEL, input=text)
+
+
+class SemanticCache:
+    """
+    Small on-disk cache: an (n, d) matrix of L2-normalized embeddings plus a
+    parallel list of entries. Lookups are a single matrix-vector product;
+    entries are scoped (e.g. by vector store + model) and evicted LRU.
+    Responses are stored as JSON-serializable values (text).
+    """
+
+    def __init__(self, cache_dir: Path = SEMCACHE_DIR, threshold: float = 0.95, max_entries: int = 1024):
+        self.cache_dir = cache_dir
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # Held by the one thread writing the cache files; see _flush()
+        self._save_lock = threading.Lock()
+        self._loaded = False
+        self._mtime = None  # mtime_ns of the entries file the in-memory cache reflects
+        self._embeddings: Optional[np.ndarray] = None
+        self._entries: list[dict] = []
+        # Bumped on every change; the files reflect _saved_version
+        self._version = 0
+        self._saved_version = 0
+
+    def _files_mtime(self):
+        try:
+            return (self.cache_dir / "entries.json").stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _load(self):
+        """
+        Load the cache files, and re-read them when another process (e.g. the upload
+        script clearing the cache) changed them, unless this one has unsaved changes.
+        """
+        mtime = self._files_mtime()
+        if self._loaded and (mtime == self._mtime or self._saved_version != self._version):
+            return
+        self._loaded = True
+        self._mtime = mtime
+        self._embeddings, self._entries = None, []
+        emb_path = self.cache_dir / "embeddings.npy"
+        entries_path = self.cache_dir / "entries.json"
+        if mtime is not None and emb_path.exists():
+            try:
+                embeddings = np.load(emb_path, allow_pickle=False)
+                entries = orjson.loads(entries_path.read_bytes())
+                if len(entries) == len(embeddings):
+                    self._embeddings, self._entries = embeddings, entries
+            except Exception as e:
+                print(f"Semantic cache load error, starting empty: {e}")
+
+    def _write(self, embeddings: Optional[np.ndarray], entries: bytes):
+        try:
+            if embeddings is None:
+                for name in ("embeddings.npy", "entries.json"):
+                    (self.cache_dir / name).unlink(missing_ok=True)
+                return
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_dir / "embeddings.tmp.npy"
+            np.save(tmp_path, embeddings)
+            os.replace(tmp_path, self.cache_dir / "embeddings.npy")
+            tmp_path = self.cache_dir / "entries.json.tmp"
+            tmp_path.write_bytes(entries)
+            os.replace(tmp_path, self.cache_dir / "entries.json")
+        except Exception as e:
+            print(f"Semantic cache save error: {e}")
+
+    def _flush(self):
+        """
+        Persist the latest state outside the main lock. One thread writes at a time;
+        changes made while it writes are picked up by its next pass, so concurrent
+        adds don't each rewrite the files.
+        """
+        while self._save_lock.acquire(blocking=False):
+            try:
+                while True:
+                    with self._lock:
+                        if self._saved_version == self._version:
+                            break
+                        version = self._version
+                        embeddings = self._embeddings
+                        entries = orjson.dumps(self._entries)
+                    self._write(embeddings, entries)
+                    with self._lock:
+                        self._saved_version = version
+                        self._mtime = self._files_mtime()
+            finally:
+                self._save_lock.release()
+            # A change that landed just before the release is ours to write,
+            # unless another thread has taken over
+            with self._lock:
+                if self._saved_version == self._version:
+                    return
+
+    def embed(self, client: OpenAI, text: str) -> Optional[np.ndarray]:
+        """Embed and normalize text; returns None if embedding fails (cache is bypassed)."""
+        try:
+            resp = _create_embedding(client, text)
+        except Exception as e:
+            print(f"Semantic cache embedding error: {e}")
+            return None
+        vec = np.asarray(resp.data[0].embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def lookup(self, scope: str, embedding: np.ndarray) -> Optional[Any]:
+        """Return the cached response most similar to embedding within scope, if above threshold."""
+        with self._lock:
+            self._load()
+            if self._embeddings is None or not self._entries:
+                return None
+            in_scope = np.array([e["scope"] == scope for e in self._entries])
+            if not in_scope.any():
+                return None
+            sims = np.where(in_scope, self._embeddings @ embedding, -1.0)
+            best = int(np.argmax(sims))
+            if sims[best] < self.threshold:
+                return None
+            entry = self._entries[best]
+            entry["last_used"] = time.time()
+            return entry["response"]
+
+    def add(self, scope: str, embedding: np.ndarray, response: Any):
+        """Cache a JSON-serializable response (e.g. answer text) under embedding."""
+        with self._lock:
+            self._load()
+            entry = {"scope": scope, "response": response, "last_used": time.time()}
+            if self._embeddings is None:
+                self._embeddings = embedding[np.newaxis, :]
+            else:
+                self._embeddings = np.vstack([self._embeddings, embedding])
+            self._entries.append(entry)
+            
+            # Evict least recently used entries beyond capacity
+            if len(self._entries) > self.max_entries:
+                keep = np.argsort([-e["last_used"] for e in self._entries])[:self.max_entries]
+                keep.sort()
+                self._embeddings = self._embeddings[keep]
+                self._entries = [self._entries[i] for i in keep]
+            self._version += 1
+        self._flush()
+
+    def clear(self):
+        """Drop all entries (e.g. after the vector store contents change)."""
+        with self._lock:
+            self._loaded = True
+            self._mtime = self._files_mtime()
+            self._embeddings = None
+            self._entries = []
+            self._version += 1
+        self._flush()
+
+
+semantic_cache = SemanticCache()
+# Paraphrased exhaustive (knowledge-graph) questions, e.g. "List all people" vs
+# "Show every person mentioned"; scoped by model, category and the data used
+exhaustive_cache = SemanticCache(cache_dir=Path(".cache/semcache_exhaustive"), threshold=0.92)
+# Final CoA answers to whole questions, scoped by vector store, model and conversation
+answer_cache = SemanticCache(cache_dir=Path(".cache/semcache_answers"), threshold=0.95)
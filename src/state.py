@@ -1,13 +1,78 @@
-import json
+import os
+import asyncio
+import threading
+import orjson
 from pathlib import Path
 from typing import Any, Dict
 
 STATE_PATH = Path(".state.json")
 
+# In-memory state for this process, persisted by flush_state(). Re-read when the file
+# changes underneath us (e.g. a script run alongside the web app) unless we hold
+# unsaved changes.
+_state: Dict[str, Any] = {}
+_state_mtime = None  # mtime_ns of the file version _state reflects
+_dirty = False
+_lock = threading.RLock()
+
+def _file_mtime():
+    try:
+        return STATE_PATH.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def get_state() -> Dict[str, Any]:
+    """The live in-memory state. Change it through update_state() so it gets persisted."""
+    global _state, _state_mtime
+    with _lock:
+        if not _dirty:
+            mtime = _file_mtime()
+            if mtime != _state_mtime:
+                _state = orjson.loads(STATE_PATH.read_bytes()) if mtime is not None else {}
+                _state_mtime = mtime
+        return _state
+
+def update_state(patch: Dict[str, Any]) -> None:
+    """Apply changed keys to the in-memory state; nothing is written until flush_state()."""
+    global _dirty
+    with _lock:
+        state = get_state()
+        for key, value in patch.items():
+            if key not in state or state[key] != value:
+                state[key] = value
+                _dirty = True
+
+def flush_state() -> None:
+    """Atomically write the state file if there are unsaved changes."""
+    global _dirty, _state_mtime
+    with _lock:
+        if not _dirty:
+            return
+        tmp_path = STATE_PATH.with_name(STATE_PATH.name + ".tmp")
+        tmp_path.write_bytes(orjson.dumps(_state, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS))
+        os.replace(tmp_path, STATE_PATH)
+        _state_mtime = _file_mtime()
+        _dirty = False
+
 def load_state() -> Dict[str, Any]:
-    if STATE_PATH.exists():
-        return json.loads(STATE_PATH.read_text())
-    return {}
+    # Callers update and save the state they get back, so hand out a private copy
+    # (an orjson round trip is cheaper than deepcopy)
+    with _lock:
+        return orjson.loads(orjson.dumps(get_state()))
 
 def save_state(state: Dict[str, Any]) -> None:
-    STATE_PATH.write_text(json.dumps(state, indent=2, sort_keys=True))
\ No newline at end of file
+    """Replace the whole state and flush it; an unchanged state isn't rewritten."""
+    global _state, _dirty
+    with _lock:
+        if state != get_state():
+            _state = orjson.loads(orjson.dumps(state))
+            _dirty = True
+        flush_state()
+
+async def update_state_async(patch: Dict[str, Any]) -> None:
+    """
+    update_state for the event loop: the in-memory state changes right away (so
+    other requests see it), the file write happens in a worker thread.
+    """
+    update_state(patch)
+    await asyncio.to_thread(flush_state)
@@ -1,15 +1,18 @@
 import os
-import json
+import hashlib
+import orjson
 import asyncio
+from functools import partial
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import List, Dict, Any
-from fastapi import FastAPI, WebSocket, UploadFile, File, HTTPException, Request
+from typing import List, Dict, Any, Optional, Tuple
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, UploadFile, File, HTTPException, Request
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse, JSONResponse
-from openai import OpenAI
 import uvicorn
-from concurrent.futures import ThreadPoolExecutor
+import aiofiles
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 # Add parent directory to path to import src modules
 import sys
@@ -17,34 +20,45 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.config import OPENAI_API_KEY, DEFAULT_MODEL
-from src.state import load_state, save_state
-from src.ingest import upload_files, attach_files_to_vector_store, wait_until_ready
-from src.coa import coa_report_with_progress, stream_manager_response
+from src.client import get_client, get_async_client, close_clients
+from src.state import get_state, update_state_async
+from src.ratelimit import rate_limited
+from src.ingest import upload_files, attach_files_to_vector_store, wait_until_ready, ocr_pdf_page, init_ocr_worker
+from src.coa import coa_report_with_progress, astream_manager_response
 from src.ask import ask_with_file_search
+from src.semcache import semantic_cache, answer_cache
 from src.extract import (
     extract_from_document, load_extracted, save_extracted, 
+    append_extracted_batch,
     merge_extraction, detect_conflicts, get_extraction_summary,
     remove_document_extraction, deduplicate_extracted_data
 )
-from src.router import classify_query, answer_exhaustive_query, should_use_extracted_data
-from web.websocket import InvestigationWebSocketManager
+from src.router import make_query_context, route, answer_exhaustive_query_async, should_use_extracted_data
+from web.websocket import InvestigationWebSocketManager, CHUNK_FLUSH_CHARS
+
+
+def _is_born_digital(pdf_doc) -> bool:
+    """Probe the first page only: any text or embedded fonts mean the PDF has a text layer."""
+    if len(pdf_doc) == 0:
+        return False
+    first_page = pdf_doc[0]
+    # flags=0 is the cheapest extraction; only the presence of text matters here
+    return bool(first_page.get_text("text", flags=0).strip() or first_page.get_fonts())
 
 
 def ocr_pdf(pdf_path: Path) -> str:
-    """Extract text from scanned PDF using OCR"""
+    """Extract text from scanned PDF using OCR, one page per OCR worker process"""
     try:
-        from pdf2image import convert_from_path
-        import pytesseract
+        import fitz  # PyMuPDF
         
-        # Convert PDF pages to images
-        images = convert_from_path(pdf_path, dpi=300)
+        with fitz.open(pdf_path) as pdf_doc:
+            page_count = len(pdf_doc)
         
-        # OCR each page
-        text_parts = []
-        for i, image in enumerate(images):
-            page_text = pytesseract.image_to_string(image)
-            text_parts.append(f"--- Page {i+1} ---\n{page_text}")
+        # Pages are rendered and OCR'd in the workers; results come back in page order
+        page_numbers = range(1, page_count + 1)
+        texts = cpu_pool.map(ocr_pdf_page, [pdf_path] * page_count, page_numbers, chunksize=1)
         
+        text_parts = [f"--- Page {i} ---\n{page_text}" for i, page_text in zip(page_numbers, texts)]
         return "\n\n".join(text_parts)
     except ImportError as e:
         print(f"OCR dependencies not installed: {e}")
@@ -54,20 +68,67 @@ def ocr_pdf(pdf_path: Path) -> str:
         return ""
 
 
-app = FastAPI(title="Investigative AI", description="ChatGPT-style investigative AI interface")
+class OrjsonResponse(JSONResponse):
+    """JSONResponse serialized with orjson (FastAPI's ORJSONResponse is deprecated)."""
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Shutdown: stop the worker pools and close the shared OpenAI connection pools
+    for pool in (io_pool, fs_pool, cpu_pool):
+        pool.shutdown(wait=False, cancel_futures=True)
+    await close_clients()
+
+
+app = FastAPI(
+    title="Investigative AI",
+    description="ChatGPT-style investigative AI interface",
+    # Extraction endpoints return large entity/conflict lists
+    default_response_class=OrjsonResponse,
+    lifespan=lifespan
+)
 
 # Mount static files and templates
 app.mount("/static", StaticFiles(directory="web/static"), name="static")
 templates = Jinja2Templates(directory="web/templates")
 
-# Initialize OpenAI client
-client = OpenAI(api_key=OPENAI_API_KEY)
+# Shared OpenAI client (one pooled HTTP/2 connection pool for every request and worker thread)
+client = get_client()
+# Async client for calls awaited directly on the event loop
+async_client = get_async_client()
 
 # Initialize WebSocket manager
 manager = InvestigationWebSocketManager(client)
 
-# Thread pool for running blocking operations
-executor = ThreadPoolExecutor(max_workers=4)
+# Separate pools so slow work of one kind can't starve the others:
+# - io_pool: blocking OpenAI calls, which mostly wait on the network
+# - fs_pool: extracted-data and cache reads/writes and PDF text extraction
+# - cpu_pool: OCR, shared across requests so workers aren't re-forked
+io_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="io")
+fs_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="fs")
+cpu_pool = ProcessPoolExecutor(max_workers=os.cpu_count(), initializer=init_ocr_worker)
+
+
+# Serializes read-modify-write updates of the state file, so concurrent uploads and
+# deletes don't overwrite each other's file_ids
+state_lock = asyncio.Lock()
+
+
+def _api_key_configured() -> bool:
+    return bool(OPENAI_API_KEY) and OPENAI_API_KEY not in ("sk-placeholder", "your_key_here")
+
+# Uploads are copied to disk this many bytes at a time
+UPLOAD_CHUNK_SIZE = 1 << 20
+# Uploads up to this size are also kept in memory, so uploading and text extraction
+# don't read the file back from disk
+UPLOAD_IN_MEMORY_MAX = 32 << 20
+# At most this many files of one request are uploaded to OpenAI at a time
+UPLOAD_CONCURRENCY = 8
+# Page size for the /api/documents files listing (the API maximum)
+FILES_LIST_PAGE_SIZE = 10000
 
 @app.get("/", response_class=HTMLResponse)
 async def read_root(request: Request):
@@ -76,14 +137,14 @@ async def read_root(request: Request):
 @app.get("/api/status")
 async def get_status():
     """Get system status and vector store information"""
-    state = load_state()
+    state = get_state()
     vector_store_id = state.get("vector_store_id")
     
     if not vector_store_id:
         return {"status": "not_initialized", "vector_store": None}
     
     try:
-        vs = client.vector_stores.retrieve(vector_store_id)
+        vs = await async_client.vector_stores.retrieve(vector_store_id)
         return {
             "status": "ready" if vs.file_counts.in_progress == 0 else "processing",
             "vector_store": {
@@ -103,141 +164,207 @@ async def get_status():
 async def create_vector_store():
     """Create a new vector store"""
     
-    if OPENAI_API_KEY == "sk-placeholder":
+    if not _api_key_configured():
         raise HTTPException(
             status_code=400, 
             detail="Please add your OpenAI API key to the .env file to use this feature."
         )
     
-    state = load_state()
-    if state.get("vector_store_id"):
-        raise HTTPException(status_code=400, detail="Vector store already exists")
+    async with state_lock:
+        if get_state().get("vector_store_id"):
+            raise HTTPException(status_code=400, detail="Vector store already exists")
+        
+        try:
+            return {"vector_store_id": await _create_vector_store()}
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to create vector store: {str(e)}")
+
+
+async def _create_vector_store() -> str:
+    """Create the vector store and record it in the state; call with state_lock held."""
+    vs = await async_client.vector_stores.create(name="investigative-ai-proto")
+    await update_state_async({"vector_store_id": vs.id, "file_ids": []})
+    return vs.id
+
+async def _save_upload(file: UploadFile) -> Tuple[Path, Optional[bytes]]:
+    """
+    Stream an uploaded file into data/docs (kept for /api/reextract).
+    Returns its path and, unless it exceeds UPLOAD_IN_MEMORY_MAX, its content.
+    """
+    temp_path = Path(f"data/docs/{file.filename}")
+    temp_path.parent.mkdir(parents=True, exist_ok=True)
     
+    # Stream to disk in chunks so neither memory nor the event loop is tied up
+    chunks, size = [], 0
+    async with aiofiles.open(temp_path, "wb") as buffer:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            await buffer.write(chunk)
+            size += len(chunk)
+            if chunks is not None:
+                chunks.append(chunk)
+                if size > UPLOAD_IN_MEMORY_MAX:
+                    chunks = None
+    return temp_path, (b"".join(chunks) if chunks is not None else None)
+
+
+@rate_limited
+def _upload_file(temp_path: Path, content: Optional[bytes] = None) -> str:
+    """Upload a file to OpenAI and return its file id."""
+    if content is not None:
+        uploaded_file = client.files.create(file=(temp_path.name, content), purpose="assistants")
+    else:
+        with open(temp_path, "rb") as f:
+            uploaded_file = client.files.create(file=f, purpose="assistants")
+    return uploaded_file.id
+
+
+async def _upload_to_vector_store(saved: List[Tuple[Path, Optional[bytes]]], vector_store_id: str) -> List[str]:
+    """Upload files concurrently, then attach them all to the vector store in one batch."""
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+    
+    async def upload_one(temp_path: Path, content: Optional[bytes]) -> str:
+        async with semaphore:
+            return await loop.run_in_executor(io_pool, partial(_upload_file, temp_path, content))
+    
+    file_ids = list(await asyncio.gather(*(upload_one(temp_path, content) for temp_path, content in saved)))
+    if file_ids:
+        await async_client.vector_stores.file_batches.create(
+            vector_store_id=vector_store_id,
+            file_ids=file_ids
+        )
+    return file_ids
+
+
+def _pdf_text_layer(pdf_path: Path, content: Optional[bytes] = None) -> str:
+    """Embedded text of a PDF; empty for scanned PDFs, which skip the page-by-page walk."""
+    import fitz  # PyMuPDF
+    pdf_doc = fitz.open(stream=content, filetype="pdf") if content is not None else fitz.open(pdf_path)
+    with pdf_doc:
+        if not _is_born_digital(pdf_doc):
+            return ""
+        parts = []
+        for i, page in enumerate(pdf_doc):
+            parts.append(page.get_text())
+            # Fonts but still no text after two pages (e.g. an empty OCR layer over a
+            # scan): stop walking and let the caller OCR it
+            if i == 1 and not "".join(parts).strip():
+                return ""
+        return "".join(parts)
+
+
+async def _document_text(temp_path: Path, content: Optional[bytes] = None) -> str:
+    """Text of an uploaded document for extraction, OCR-ing scanned PDFs."""
+    loop = asyncio.get_running_loop()
+    filename = temp_path.name
+    
+    # For PDFs, we need to extract text first
+    if filename.lower().endswith('.pdf'):
+        try:
+            doc_text = await loop.run_in_executor(fs_pool, partial(_pdf_text_layer, temp_path, content))
+            
+            # If no text extracted, try OCR (scanned PDF)
+            if not doc_text.strip():
+                print(f"No text found in {filename}, attempting OCR...")
+                doc_text = await loop.run_in_executor(io_pool, partial(ocr_pdf, temp_path))
+                if doc_text:
+                    print(f"OCR extracted {len(doc_text)} characters from {filename}")
+                else:
+                    print(f"OCR failed for {filename}")
+            return doc_text
+        except ImportError:
+            # PyMuPDF not installed, skip extraction
+            print(f"PyMuPDF not installed, skipping extraction for {filename}")
+            return ""
+        except Exception as e:
+            print(f"PDF extraction error for {filename}: {e}")
+            return ""
+    
+    # Try to read as text
     try:
-        vs = client.vector_stores.create(name="investigative-ai-proto")
-        state["vector_store_id"] = vs.id
-        state["file_ids"] = []
-        save_state(state)
-        
-        return {"vector_store_id": vs.id}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to create vector store: {str(e)}")
+        if content is None:
+            async with aiofiles.open(temp_path, "rb") as f:
+                content = await f.read()
+        return content.decode('utf-8')
+    except:
+        return ""
+
 
 @app.post("/api/upload")
 async def upload_documents(files: List[UploadFile] = File(...)):
     """Upload documents to the vector store and extract structured data"""
     
-    if not OPENAI_API_KEY or OPENAI_API_KEY in ["sk-placeholder", "your_key_here"]:
+    if not _api_key_configured():
         raise HTTPException(
             status_code=400, 
             detail="Please add your OpenAI API key to the .env file to enable document uploads."
         )
     
-    state = load_state()
-    vector_store_id = state.get("vector_store_id")
-    
-    if not vector_store_id:
-        try:
-            vs = client.vector_stores.create(name="investigative-ai-proto")
-            vector_store_id = vs.id
-            state["vector_store_id"] = vs.id
-            state["file_ids"] = []
-            save_state(state)
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Failed to create vector store: {str(e)}")
+    async with state_lock:
+        vector_store_id = get_state().get("vector_store_id")
+        if not vector_store_id:
+            try:
+                vector_store_id = await _create_vector_store()
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"Failed to create vector store: {str(e)}")
     
     try:
-        file_ids = []
-        extraction_results = []
         loop = asyncio.get_running_loop()
         
-        for file in files:
-            temp_path = Path(f"data/docs/{file.filename}")
-            temp_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            content = await file.read()
-            with open(temp_path, "wb") as buffer:
-                buffer.write(content)
-            
-            # Upload to vector store
-            with open(temp_path, "rb") as f:
-                uploaded_file = client.files.create(file=f, purpose="assistants")
-                file_ids.append(uploaded_file.id)
+        saved = [await _save_upload(file) for file in files]
+        
+        # Files are independent: vector store uploads and text extraction (including
+        # OCR) for all of them run concurrently
+        uploads = _upload_to_vector_store(saved, vector_store_id)
+        texts = asyncio.gather(*(_document_text(temp_path, content) for temp_path, content in saved))
+        file_ids, doc_texts = await asyncio.gather(uploads, texts)
+        
+        # Run LLM extraction for every document with text, concurrently
+        to_extract = [(file.filename, doc_text) for file, doc_text in zip(files, doc_texts) if doc_text]
+        extractions = await asyncio.gather(*(
+            loop.run_in_executor(io_pool, partial(extract_from_document, client, DEFAULT_MODEL, doc_text, filename))
+            for filename, doc_text in to_extract
+        ))
+        
+        extraction_results = []
+        new_extractions = [(filename, extraction) for (filename, _), extraction in zip(to_extract, extractions)]
+        if extractions:
+            all_data = await loop.run_in_executor(fs_pool, partial(load_extracted, mutable=True))
+        for filename, extraction in new_extractions:
+            extraction_results.append({
+                "filename": filename,
+                "entities": len(extraction.get("entities", [])),
+                "claims": len(extraction.get("claims", [])),
+                "events": len(extraction.get("events", []))
+            })
             
-            client.vector_stores.files.create(
-                vector_store_id=vector_store_id, 
-                file_id=uploaded_file.id
+            # Merge with existing extractions (written below, only the new ones)
+            all_data = merge_extraction(all_data, extraction, filename)
+        
+        if extractions:
+            # Detect conflicts across all documents once, after every upload is merged
+            all_data["conflicts"] = await loop.run_in_executor(
+                io_pool,
+                partial(detect_conflicts, all_data, client, DEFAULT_MODEL)
             )
-            
-            # Extract structured data for preprocessing
-            # For PDFs, we need to extract text first
-            doc_text = ""
-            if file.filename.lower().endswith('.pdf'):
-                try:
-                    import fitz  # PyMuPDF
-                    pdf_doc = fitz.open(temp_path)
-                    for page in pdf_doc:
-                        doc_text += page.get_text()
-                    pdf_doc.close()
-                    
-                    # If no text extracted, try OCR (scanned PDF)
-                    if not doc_text.strip():
-                        print(f"No text found in {file.filename}, attempting OCR...")
-                        doc_text = await loop.run_in_executor(
-                            executor,
-                            lambda: ocr_pdf(temp_path)
-                        )
-                        if doc_text:
-                            print(f"OCR extracted {len(doc_text)} characters from {file.filename}")
-                        else:
-                            print(f"OCR failed for {file.filename}")
-                            
-                except ImportError:
-                    # PyMuPDF not installed, skip extraction
-                    print(f"PyMuPDF not installed, skipping extraction for {file.filename}")
-                    doc_text = ""
-                except Exception as e:
-                    print(f"PDF extraction error for {file.filename}: {e}")
-                    doc_text = ""
-            else:
-                # Try to read as text
-                try:
-                    doc_text = content.decode('utf-8')
-                except:
-                    doc_text = ""
-            
-            # Run LLM extraction if we have text
-            if doc_text:
-                extraction = await loop.run_in_executor(
-                    executor,
-                    lambda: extract_from_document(client, DEFAULT_MODEL, doc_text, file.filename)
-                )
-                extraction_results.append({
-                    "filename": file.filename,
-                    "entities": len(extraction.get("entities", [])),
-                    "claims": len(extraction.get("claims", [])),
-                    "events": len(extraction.get("events", []))
-                })
-                
-                # Merge with existing extractions
-                all_data = load_extracted()
-                all_data = merge_extraction(all_data, extraction, file.filename)
-                
-                # Detect conflicts across all documents
-                all_data["conflicts"] = await loop.run_in_executor(
-                    executor,
-                    lambda: detect_conflicts(all_data, client, DEFAULT_MODEL)
-                )
-                save_extracted(all_data)
+            # All new extractions and the conflicts go to disk in a single log write
+            await loop.run_in_executor(
+                fs_pool,
+                partial(append_extracted_batch, new_extractions, all_data["conflicts"])
+            )
+        
+        # Re-read the state: other requests may have changed it while this one uploaded
+        async with state_lock:
+            await update_state_async({"file_ids": get_state().get("file_ids", []) + file_ids})
         
-        state["file_ids"] = state.get("file_ids", []) + file_ids
-        save_state(state)
+        # Cached retrievals no longer reflect the vector store contents
+        await _clear_answer_caches()
         
         return {
             "uploaded_files": len(files), 
             "file_ids": file_ids,
             "extraction": extraction_results,
-            "extraction_summary": get_extraction_summary()
+            "extraction_summary": await loop.run_in_executor(fs_pool, get_extraction_summary)
         }
         
     except Exception as e:
@@ -248,40 +375,57 @@ async def upload_documents(files: List[UploadFile] = File(...)):
 @app.get("/api/documents")
 async def list_documents():
     """List uploaded documents"""
-    state = load_state()
+    state = get_state()
     vector_store_id = state.get("vector_store_id")
     file_ids = state.get("file_ids", [])
     
     if not vector_store_id:
         return {"documents": []}
     
+    # One paginated listing instead of a retrieve round trip per file; files deleted
+    # on the OpenAI side are simply missing from it. Large pages keep it to one
+    # request for most accounts.
+    wanted = set(file_ids)
+    files_by_id = {}
+    try:
+        async for file_info in async_client.files.list(purpose="assistants", limit=FILES_LIST_PAGE_SIZE):
+            if file_info.id in wanted:
+                files_by_id[file_info.id] = file_info
+                if len(files_by_id) == len(wanted):
+                    break
+    except Exception as e:
+        print(f"Could not list files: {e}")
+    
     documents = []
     for file_id in file_ids:
-        try:
-            file_info = client.files.retrieve(file_id)
-            documents.append({
-                "id": file_id,
-                "filename": file_info.filename,
-                "status": file_info.status,
-                "created_at": file_info.created_at
-            })
-        except Exception:
+        file_info = files_by_id.get(file_id)
+        if file_info is None:
             continue
+        documents.append({
+            "id": file_id,
+            "filename": file_info.filename,
+            "status": file_info.status,
+            "created_at": file_info.created_at
+        })
     
     return {"documents": documents}
 
 @app.delete("/api/documents/{file_id}")
 async def delete_document(file_id: str):
     """Delete a document from the vector store"""
-    state = load_state()
-    
     try:
-        client.files.delete(file_id)
-        file_ids = state.get("file_ids", [])
-        if file_id in file_ids:
-            file_ids.remove(file_id)
-            state["file_ids"] = file_ids
-            save_state(state)
+        await async_client.files.delete(file_id)
+        async with state_lock:
+            state = get_state()
+            patch = {"file_ids": [fid for fid in state.get("file_ids", []) if fid != file_id]}
+            # Forget the upload script's content hash too, so it uploads the file again
+            if "file_hashes" in state:
+                patch["file_hashes"] = {
+                    digest: fid for digest, fid in state["file_hashes"].items() if fid != file_id
+                }
+            await update_state_async(patch)
+        
+        await _clear_answer_caches()
         
         return {"deleted": file_id}
     except Exception as e:
@@ -293,29 +437,76 @@ async def websocket_endpoint(websocket: WebSocket):
     try:
         while True:
             data = await websocket.receive_text()
-            message_data = json.loads(data)
+            message_data = orjson.loads(data)
             
             if message_data["type"] == "question":
                 question = message_data["content"]
                 history = message_data.get("history", [])
                 await handle_streaming_question(websocket, question, history)
+    except WebSocketDisconnect:
+        # Normal client close
+        pass
     except Exception as e:
         print(f"WebSocket error: {e}")
     finally:
         manager.disconnect(websocket)
 
 
+def _answer_scope(vector_store_id: str, history: list) -> str:
+    """Answer cache scope: the same question only matches within one store, model and conversation."""
+    history_hash = hashlib.sha256(orjson.dumps(history or [])).hexdigest()
+    return f"{vector_store_id}|{DEFAULT_MODEL}|{history_hash}"
+
+
+async def _clear_answer_caches():
+    """Drop cached retrievals and answers (the vector store contents changed)."""
+    loop = asyncio.get_running_loop()
+    for cache in (semantic_cache, answer_cache):
+        await loop.run_in_executor(fs_pool, cache.clear)
+
+
+async def _lookup_answer(question: str, scope: str):
+    """Return (cached answer or None, question embedding or None)."""
+    loop = asyncio.get_running_loop()
+    embedding = await loop.run_in_executor(io_pool, partial(answer_cache.embed, client, question))
+    if embedding is None:
+        return None, None
+    # Loads the cache from disk on first use and waits on writers, so keep it off the loop
+    cached = await loop.run_in_executor(fs_pool, partial(answer_cache.lookup, scope, embedding))
+    return cached, embedding
+
+
+async def _store_answer(scope: str, embedding, response: str):
+    """Cache a finished answer (written to disk off the event loop); failed answers are skipped."""
+    if embedding is None or not response or response.startswith("Error generating response"):
+        return
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(fs_pool, partial(answer_cache.add, scope, embedding, response))
+
+
+async def _send_chunked(websocket: WebSocket, response: str, question: str):
+    """Send an already complete response through the same stream messages, in full-size frames."""
+    # Now that response is ready, signal stream start
+    await manager.send_stream_start(websocket)
+    
+    for i in range(0, len(response), CHUNK_FLUSH_CHARS):
+        await manager.send_chunk(websocket, response[i:i + CHUNK_FLUSH_CHARS])
+    
+    # Signal stream end
+    await manager.send_stream_end(websocket, question)
+
+
 async def handle_streaming_question(websocket: WebSocket, question: str, history: list = None):
     """Handle investigation questions with streaming response"""
     
     if history is None:
         history = []
     
-    if OPENAI_API_KEY == "sk-placeholder":
+    if not _api_key_configured():
         await manager.send_error(websocket, "Please add your OpenAI API key to the .env file.")
         return
     
-    state = load_state()
+    state = get_state()
     vector_store_id = state.get("vector_store_id")
     
     if not vector_store_id:
@@ -326,78 +517,78 @@ async def handle_streaming_question(websocket: WebSocket, question: str, history
         loop = asyncio.get_running_loop()
         
         # Load extracted data for entity-aware routing
-        extracted_data = await loop.run_in_executor(executor, load_extracted)
+        extracted_data = await loop.run_in_executor(fs_pool, load_extracted)
         
         # Route query to appropriate handler (now entity-aware)
-        query_type = classify_query(question, extracted_data)
+        query = make_query_context(question)
+        query_type, category, matching_entities = route(query, extracted_data)
         
         if query_type == "EXHAUSTIVE":
             # Use preprocessed extracted data for exhaustive queries
             # Send "graph" stage to trigger simplified loading UI
             await manager.send_stage_update(websocket, "graph", "Querying knowledge graph...")
             
-            response, success = await loop.run_in_executor(
-                executor,
-                lambda: answer_exhaustive_query(question, extracted_data, client, DEFAULT_MODEL)
+            response, success = await answer_exhaustive_query_async(
+                query, extracted_data, async_client, DEFAULT_MODEL, category, matching_entities
             )
             
-            # Now that response is ready, signal stream start
-            await manager.send_stream_start(websocket)
-            
-            # Send response in chunks for consistent UX
-            chunk_size = 50
-            for i in range(0, len(response), chunk_size):
-                await manager.send_chunk(websocket, response[i:i + chunk_size])
-                await asyncio.sleep(0.01)
-            
-            # Signal stream end
-            await manager.send_stream_end(websocket, question)
+            await _send_chunked(websocket, response, question)
+            return
+        
+        # SPECIFIC queries use CoA + file_search, unless this (or a paraphrase of it)
+        # was already answered in the same conversation state
+        scope = _answer_scope(vector_store_id, history)
+        cached, embedding = await _lookup_answer(question, scope)
+        if cached is not None:
+            await _send_chunked(websocket, cached, question)
             return
         
-        # SPECIFIC queries use CoA + file_search
         # Send initial stage
         await manager.send_stage_update(websocket, "workers", "Analyzing documents with worker agents...")
         
-        # Capture the event loop BEFORE entering thread pool
-        loop = asyncio.get_running_loop()
-        
         # Track progress via queue
-        progress_queue = asyncio.Queue()
+        progress_queue = asyncio.Queue(maxsize=64)
         
         def on_worker_progress(status: str, current: int, total: int):
             """Callback to track worker progress (runs in thread)"""
-            # Use the captured loop, not get_event_loop()
+            # Use the loop captured at the top of the handler, not get_event_loop()
             asyncio.run_coroutine_threadsafe(
                 progress_queue.put(("worker", current, total, status)),
                 loop
             )
         
         async def run_workers():
-            return await loop.run_in_executor(
-                executor,
-                lambda: coa_report_with_progress(
-                    client, DEFAULT_MODEL, vector_store_id, question, 
-                    n_workers=4, on_progress=on_worker_progress,
-                    conversation_history=history
+            try:
+                return await loop.run_in_executor(
+                    io_pool,
+                    partial(
+                        coa_report_with_progress,
+                        client, DEFAULT_MODEL, vector_store_id, question, 
+                        n_workers=4, on_progress=on_worker_progress,
+                        conversation_history=history,
+                        straggler_timeout=15.0
+                    )
                 )
-            )
+            finally:
+                # Completion goes through the same queue, so the loop below never polls
+                await progress_queue.put(("done", None, None, None))
         
         # Start workers and send progress updates
         worker_task = asyncio.create_task(run_workers())
         
-        # Send progress updates while workers run
+        # Send progress updates as they arrive until the workers finish; updates that
+        # queued up while a send was in flight are stale, so only the newest is sent
         workers_done = False
         while not workers_done:
-            try:
-                msg = await asyncio.wait_for(progress_queue.get(), timeout=0.5)
-                if msg[0] == "worker":
-                    _, current, total, status = msg
-                    await manager.send_worker_progress(websocket, current, total, status)
-            except asyncio.TimeoutError:
-                pass
-            
-            if worker_task.done():
-                workers_done = True
+            messages = [await progress_queue.get()]
+            while not progress_queue.empty():
+                messages.append(progress_queue.get_nowait())
+            # Abandoned stragglers may still report after "done", so check every message
+            workers_done = any(m[0] == "done" for m in messages)
+            progress = [m for m in messages if m[0] == "worker"]
+            if progress:
+                _, current, total, status = progress[-1]
+                await manager.send_worker_progress(websocket, current, total, status)
         
         # Get worker results
         worker_outputs, manager_input = await worker_task
@@ -405,26 +596,16 @@ async def handle_streaming_question(websocket: WebSocket, question: str, history
         # Send synthesizing stage - keep this visible while LLM processes
         await manager.send_stage_update(websocket, "synthesizing", "Synthesizing findings...")
         
-        # Stream the manager response
-        def stream_response():
-            """Generator wrapper for streaming (runs in thread)"""
-            return list(stream_manager_response(client, DEFAULT_MODEL, manager_input))
-        
-        # Run streaming in thread and send chunks
-        # Keep "synthesizing" loading state visible until response is ready
-        chunks = await loop.run_in_executor(executor, stream_response)
-        
-        # Now that we have content ready, signal stream start (removes loading indicator)
-        await manager.send_stream_start(websocket)
-        
-        for chunk in chunks:
-            if chunk:
-                await manager.send_chunk(websocket, chunk)
-                await asyncio.sleep(0.01)  # Small delay for smooth rendering
+        # Stream the manager response as it is generated
+        response = await manager.stream_chunks(
+            websocket, astream_manager_response(async_client, DEFAULT_MODEL, manager_input)
+        )
         
         # Signal stream end
         await manager.send_stream_end(websocket, question)
         
+        await _store_answer(scope, embedding, response)
+        
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -435,14 +616,14 @@ async def handle_streaming_question(websocket: WebSocket, question: str, history
 async def ask_question(request: Dict[str, Any]):
     """Ask a question and get a response (non-streaming fallback)"""
     
-    if OPENAI_API_KEY == "sk-placeholder":
+    if not _api_key_configured():
         raise HTTPException(
             status_code=400, 
             detail="Please add your OpenAI API key to the .env file."
         )
     
     question = request.get("question", "")
-    state = load_state()
+    state = get_state()
     vector_store_id = state.get("vector_store_id")
     
     if not vector_store_id:
@@ -452,24 +633,30 @@ async def ask_question(request: Dict[str, Any]):
         loop = asyncio.get_running_loop()
         
         # Load extracted data for entity-aware routing
-        extracted_data = await loop.run_in_executor(executor, load_extracted)
+        extracted_data = await loop.run_in_executor(fs_pool, load_extracted)
         
         # Route query to appropriate handler (now entity-aware)
-        query_type = classify_query(question, extracted_data)
+        query = make_query_context(question)
+        query_type, category, matching_entities = route(query, extracted_data)
         
         if query_type == "EXHAUSTIVE":
-            response, success = await loop.run_in_executor(
-                executor,
-                lambda: answer_exhaustive_query(question, extracted_data, client, DEFAULT_MODEL)
+            response, success = await answer_exhaustive_query_async(
+                query, extracted_data, async_client, DEFAULT_MODEL, category, matching_entities
             )
             return {"response": response, "question": question, "query_type": "exhaustive"}
         
-        # SPECIFIC queries use CoA
+        # SPECIFIC queries use CoA, unless a similar question was already answered
+        scope = _answer_scope(vector_store_id, [])
+        cached, embedding = await _lookup_answer(question, scope)
+        if cached is not None:
+            return {"response": cached, "question": question, "query_type": "specific"}
+        
         from src.coa import coa_report
         report = await loop.run_in_executor(
-            executor,
-            lambda: coa_report(client, DEFAULT_MODEL, vector_store_id, question, n_workers=4)
+            io_pool,
+            partial(coa_report, client, DEFAULT_MODEL, vector_store_id, question, n_workers=4)
         )
+        await _store_answer(scope, embedding, report)
         return {"response": report, "question": question, "query_type": "specific"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
@@ -479,7 +666,8 @@ async def ask_question(request: Dict[str, Any]):
 async def get_extraction_status():
     """Get status of preprocessed extracted data"""
     try:
-        extracted_data = load_extracted()
+        loop = asyncio.get_running_loop()
+        extracted_data = await loop.run_in_executor(fs_pool, load_extracted)
         summary = get_extraction_summary(extracted_data)
         return {
             "status": "ready" if summary["documents"] > 0 else "empty",
@@ -495,7 +683,8 @@ async def get_extraction_status():
 async def get_conflicts():
     """Get all detected conflicts/inconsistencies"""
     try:
-        extracted_data = load_extracted()
+        loop = asyncio.get_running_loop()
+        extracted_data = await loop.run_in_executor(fs_pool, load_extracted)
         return {
             "conflicts": extracted_data.get("conflicts", []),
             "total": len(extracted_data.get("conflicts", []))
@@ -508,7 +697,8 @@ async def get_conflicts():
 async def get_entities():
     """Get all extracted entities"""
     try:
-        extracted_data = load_extracted()
+        loop = asyncio.get_running_loop()
+        extracted_data = await loop.run_in_executor(fs_pool, load_extracted)
         return {
             "entities": extracted_data.get("entities", []),
             "total": len(extracted_data.get("entities", []))
@@ -521,11 +711,12 @@ async def get_entities():
 async def deduplicate_extraction():
     """Deduplicate entities in the extracted data"""
     try:
-        extracted_data = load_extracted()
+        loop = asyncio.get_running_loop()
+        extracted_data = await loop.run_in_executor(fs_pool, partial(load_extracted, mutable=True))
         before_count = len(extracted_data.get("entities", []))
         
-        extracted_data = deduplicate_extracted_data(extracted_data)
-        save_extracted(extracted_data)
+        extracted_data = await loop.run_in_executor(fs_pool, deduplicate_extracted_data, extracted_data)
+        await loop.run_in_executor(fs_pool, save_extracted, extracted_data)
         
         after_count = len(extracted_data.get("entities", []))
         
@@ -543,7 +734,7 @@ async def deduplicate_extraction():
 async def reextract_document(filename: str):
     """Re-extract a document using OCR (for scanned PDFs)"""
     
-    if not OPENAI_API_KEY or OPENAI_API_KEY in ["sk-placeholder", "your_key_here"]:
+    if not _api_key_configured():
         raise HTTPException(status_code=400, detail="API key not configured")
     
     # Find the file in data/docs
@@ -557,39 +748,38 @@ async def reextract_document(filename: str):
         # Try regular text extraction first
         doc_text = ""
         if filename.lower().endswith('.pdf'):
-            import fitz
-            pdf_doc = fitz.open(file_path)
-            for page in pdf_doc:
-                doc_text += page.get_text()
-            pdf_doc.close()
+            doc_text = await loop.run_in_executor(fs_pool, partial(_pdf_text_layer, file_path))
             
             # If no text, use OCR
             if not doc_text.strip():
                 print(f"Using OCR for {filename}...")
-                doc_text = await loop.run_in_executor(executor, lambda: ocr_pdf(file_path))
+                doc_text = await loop.run_in_executor(io_pool, partial(ocr_pdf, file_path))
         
         if not doc_text.strip():
             raise HTTPException(status_code=400, detail="Could not extract text from document")
         
         # Remove old extraction for this document
-        remove_document_extraction(filename)
+        await loop.run_in_executor(fs_pool, remove_document_extraction, filename)
         
         # Run new extraction
         extraction = await loop.run_in_executor(
-            executor,
-            lambda: extract_from_document(client, DEFAULT_MODEL, doc_text, filename)
+            io_pool,
+            partial(extract_from_document, client, DEFAULT_MODEL, doc_text, filename)
         )
         
         # Merge with existing data
-        all_data = load_extracted()
+        all_data = await loop.run_in_executor(fs_pool, partial(load_extracted, mutable=True))
         all_data = merge_extraction(all_data, extraction, filename)
         
         # Re-detect conflicts
         all_data["conflicts"] = await loop.run_in_executor(
-            executor,
-            lambda: detect_conflicts(all_data, client, DEFAULT_MODEL)
+            io_pool,
+            partial(detect_conflicts, all_data, client, DEFAULT_MODEL)
+        )
+        await loop.run_in_executor(
+            fs_pool,
+            partial(append_extracted_batch, [(filename, extraction)], all_data["conflicts"])
         )
-        save_extracted(all_data)
         
         return {
             "filename": filename,
@@ -600,7 +790,7 @@ async def reextract_document(filename: str):
                 "key_facts": len(extraction.get("key_facts", []))
             },
             "text_length": len(doc_text),
-            "summary": get_extraction_summary()
+            "summary": await loop.run_in_executor(fs_pool, get_extraction_summary)
         }
         
     except HTTPException:
@@ -612,4 +802,9 @@ async def reextract_document(filename: str):
 
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # uvloop and httptools come with uvicorn[standard]; uvloop isn't available on Windows
+    uvicorn.run(
+        app, host="0.0.0.0", port=8000,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools", ws="websockets"
+    )
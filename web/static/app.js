@@ -6,6 +6,7 @@ class InvestigativeAI {
         this.isProcessing = false;
         this.currentStreamingMessage = null;
         this.streamingContent = '';
+        this.pendingStreamRender = null;
         
         this.initializeElements();
         this.initializeEventListeners();
@@ -75,6 +76,9 @@ class InvestigativeAI {
         const wsUrl = `${protocol}//${window.location.host}/ws`;
         
         this.ws = new WebSocket(wsUrl);
+        // Server messages are UTF-8 JSON sent as binary frames
+        this.ws.binaryType = 'arraybuffer';
+        this.textDecoder = new TextDecoder();
 
         this.ws.onopen = () => {
             console.log('WebSocket connected');
@@ -83,7 +87,8 @@ class InvestigativeAI {
         };
 
         this.ws.onmessage = (event) => {
-            const data = JSON.parse(event.data);
+            const text = typeof event.data === 'string' ? event.data : this.textDecoder.decode(event.data);
+            const data = JSON.parse(text);
             this.handleWebSocketMessage(data);
         };
 
@@ -343,15 +348,25 @@ class InvestigativeAI {
         if (!chunk) return;
         
         this.streamingContent += chunk;
-        const contentDiv = document.getElementById('streamingContent');
-        if (contentDiv) {
-            // Format and render with cursor
-            contentDiv.innerHTML = this.formatMessage(this.streamingContent) + '<span class="streaming-cursor"></span>';
-            this.scrollToBottom();
+        // Chunks can arrive faster than the screen refreshes; re-render at most once per frame
+        if (!this.pendingStreamRender) {
+            this.pendingStreamRender = requestAnimationFrame(() => {
+                this.pendingStreamRender = null;
+                const contentDiv = document.getElementById('streamingContent');
+                if (contentDiv) {
+                    // Format and render with cursor
+                    contentDiv.innerHTML = this.formatMessage(this.streamingContent) + '<span class="streaming-cursor"></span>';
+                    this.scrollToBottom();
+                }
+            });
         }
     }
 
     finishStreamingResponse() {
+        if (this.pendingStreamRender) {
+            cancelAnimationFrame(this.pendingStreamRender);
+            this.pendingStreamRender = null;
+        }
         const contentDiv = document.getElementById('streamingContent');
         const messageDiv = document.getElementById('streamingMessage');
         
@@ -1,9 +1,20 @@
-import json
+import orjson
+import time
 import asyncio
-from typing import List
+from typing import AsyncIterator, List
 from fastapi import WebSocket
 from openai import OpenAI
 
+# Streamed chunks arriving within this many seconds of the first are sent as one
+# frame, up to this many characters
+CHUNK_FLUSH_INTERVAL = 0.01
+CHUNK_FLUSH_CHARS = 16384
+# Streamed chunks buffered between the model stream and the client
+STREAM_QUEUE_SIZE = 64
+
+# Messages with constant payloads are encoded once
+_STREAM_START_FRAME = orjson.dumps({"type": "stream_start"})
+
 class InvestigationWebSocketManager:
     def __init__(self, client: OpenAI):
         self.active_connections: List[WebSocket] = []
@@ -19,8 +30,12 @@ class InvestigationWebSocketManager:
 
     async def send_message(self, message: dict, websocket: WebSocket):
         """Send a message to a specific websocket connection"""
+        # orjson's UTF-8 bytes go out as-is in a binary frame (no decode/re-encode)
+        await self._send_frame(orjson.dumps(message), websocket)
+
+    async def _send_frame(self, frame: bytes, websocket: WebSocket):
         try:
-            await websocket.send_text(json.dumps(message))
+            await websocket.send_bytes(frame)
         except Exception as e:
             print(f"Error sending message: {e}")
             self.disconnect(websocket)
@@ -45,9 +60,7 @@ class InvestigationWebSocketManager:
 
     async def send_stream_start(self, websocket: WebSocket):
         """Signal that streaming response is starting"""
-        await self.send_message({
-            "type": "stream_start"
-        }, websocket)
+        await self._send_frame(_STREAM_START_FRAME, websocket)
 
     async def send_chunk(self, websocket: WebSocket, chunk: str):
         """Send streaming response chunk"""
@@ -56,12 +69,66 @@ class InvestigationWebSocketManager:
             "content": chunk
         }, websocket)
 
+    async def stream_chunks(self, websocket: WebSocket, chunks: AsyncIterator[str]) -> str:
+        """
+        Signal stream start, then forward streamed text, coalescing chunks that arrive
+        close together into one frame. Returns the full text.
+        """
+        loop = asyncio.get_running_loop()
+        # Bounded, so a slow client makes the producer stop reading the stream rather
+        # than letting chunks pile up in memory
+        queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        done = object()
+
+        async def produce():
+            try:
+                async for chunk in chunks:
+                    if chunk:
+                        await queue.put(chunk)
+            except Exception:
+                await queue.put(done)
+                raise
+            await queue.put(done)
+
+        producer = asyncio.create_task(produce())
+        parts = []
+        try:
+            finished = False
+            while not finished:
+                item = await queue.get()
+                if item is done:
+                    break
+                batch, size = [item], len(item)
+                deadline = loop.time() + CHUNK_FLUSH_INTERVAL
+                while size < CHUNK_FLUSH_CHARS:
+                    try:
+                        item = await asyncio.wait_for(queue.get(), deadline - loop.time())
+                    except asyncio.TimeoutError:
+                        break
+                    if item is done:
+                        finished = True
+                        break
+                    batch.append(item)
+                    size += len(item)
+                # Keep the "synthesizing" loading state visible until there is text to show
+                if not parts:
+                    await self.send_stream_start(websocket)
+                parts.append("".join(batch))
+                await self.send_chunk(websocket, parts[-1])
+            if not parts:
+                await self.send_stream_start(websocket)
+            # Surface errors raised by the stream itself
+            await producer
+        finally:
+            producer.cancel()
+        return "".join(parts)
+
     async def send_stream_end(self, websocket: WebSocket, question: str):
         """Signal that streaming response is complete"""
         await self.send_message({
             "type": "stream_end",
             "question": question,
-            "timestamp": asyncio.get_event_loop().time()
+            "timestamp": time.monotonic()
         }, websocket)
 
     async def send_error(self, websocket: WebSocket, error_message: str):
@@ -77,6 +144,6 @@ class InvestigationWebSocketManager:
             "type": "response",
             "content": response,
             "question": question,
-            "timestamp": asyncio.get_event_loop().time()
+            "timestamp": time.monotonic()
         }, websocket)
 